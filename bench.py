@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+Benchmarks of leptjson against the standard json module.
+
+    python bench.py --output results.json
+    python bench.py --baseline results.json --threshold 0.1
+
+Results are printed, or written to --output, as json. With --baseline the run
+fails when a leptjson metric is worse than in the baseline by more than the
+threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+import leptjson
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.1
+
+
+def synthetic_strings(count: int, seed: int = 0) -> list[str]:
+    """
+    strings with escapes and non-ascii characters
+    :param count:
+    :param seed:
+    :return:
+    """
+    generator = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz     "\\\n\t/éü中文😀'
+    return [''.join(generator.choices(alphabet, k=generator.randint(0, 200))) for _ in range(count)]
+
+
+def synthetic_numbers(count: int, seed: int = 0) -> list[list[float]]:
+    """
+    rows of integers, fractions and numbers with exponents
+    :param count:
+    :param seed:
+    :return:
+    """
+    generator = random.Random(seed)
+    return [[float(generator.randint(-10 ** 9, 10 ** 9)), generator.random(),
+             generator.uniform(-1e300, 1e300), generator.uniform(-1e-300, 1e-300)]
+            for _ in range(count)]
+
+
+def synthetic_nested(count: int, depth: int = 400) -> list[Any]:
+    """
+    arrays and objects nested depth deep, within the recursion limit of json
+    :param count:
+    :param depth:
+    :return:
+    """
+    values = []
+    for index in range(count):
+        value: Any = index
+        for level in range(depth):
+            value = {'k': value} if level % 2 else [value]
+        values.append(value)
+    return values
+
+
+def best_time(function: Callable[[], Any], repeat: int) -> float:
+    """
+    :param function:
+    :param repeat:
+    :return: the shortest of repeat runs, in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(function: Callable[[], Any]) -> int:
+    """
+    :param function:
+    :return: peak of the memory allocated while running function, in bytes
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def document_benchmark(text: str, repeat: int) -> dict[str, float]:
+    """
+    throughput of parse and stringify, and of json.loads and json.dumps, over one
+    document, and the peak memory of parse
+    :param text:
+    :param repeat:
+    :return:
+    """
+    size = len(text.encode('utf-8')) / 1e6
+    value = leptjson.parse(text)
+    return {
+        'size_mb': size,
+        'parse_mb_s': size / best_time(lambda: leptjson.parse(text), repeat),
+        'stringify_mb_s': size / best_time(lambda: leptjson.stringify(value), repeat),
+        'json_parse_mb_s': size / best_time(lambda: json.loads(text), repeat),
+        'json_stringify_mb_s': size / best_time(lambda: json.dumps(value), repeat),
+        'parse_peak_bytes': peak_memory(lambda: leptjson.parse(text)),
+    }
+
+
+def ndjson_benchmark(path: str, repeat: int) -> dict[str, float]:
+    """
+    throughput of iter_parse and latency percentiles of parsing each line
+    :param path:
+    :param repeat:
+    :return:
+    """
+    with open(path, 'rb') as file:
+        lines = [line for line in file.read().splitlines() if line.strip()]
+    size = os.path.getsize(path) / 1e6
+    decoder = leptjson.Decoder()
+    latencies = []
+    for _ in range(repeat):
+        for line in lines:
+            start = time.perf_counter_ns()
+            decoder.parse(line)
+            latencies.append(time.perf_counter_ns() - start)
+    latencies.sort()
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] / 1000
+
+    return {
+        'documents': len(lines),
+        'size_mb': size,
+        'parse_mb_s': size / best_time(lambda: sum(1 for _ in leptjson.iter_parse(path)), repeat),
+        'json_parse_mb_s': size / best_time(lambda: [json.loads(line) for line in lines], repeat),
+        'latency_p50_us': percentile(0.5),
+        'latency_p90_us': percentile(0.9),
+        'latency_p99_us': percentile(0.99),
+        'latency_max_us': latencies[-1] / 1000,
+    }
+
+
+def run(repeat: int = DEFAULT_REPEAT, scale: float = 1.0) -> dict[str, Any]:
+    """
+    run every benchmark
+    :param repeat: number of runs of each measurement, the best is kept
+    :param scale: size of the synthetic inputs, relative to the default
+    :return: json-serializable results
+    """
+    with open(os.path.join(DATA_DIR, 'twitter.json'), encoding='utf-8') as file:
+        twitter = file.read()
+    count = max(1, int(10000 * scale))
+    documents = {
+        'twitter': twitter,
+        'strings': json.dumps(synthetic_strings(count)),
+        'numbers': json.dumps(synthetic_numbers(count)),
+        'nested': json.dumps(synthetic_nested(max(1, count // 50))),
+    }
+    benchmarks = {name: document_benchmark(text, repeat) for name, text in documents.items()}
+    benchmarks['ndjson'] = ndjson_benchmark(os.path.join(DATA_DIR, 'one-json-per-line.txt'), repeat)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'scale': scale,
+        'benchmarks': benchmarks,
+    }
+
+
+def compare(baseline: dict[str, Any], results: dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """
+    find the leptjson metrics of results worse than in baseline by more than threshold;
+    throughputs (_mb_s) are worse when lower, memory (_bytes) and latencies (_us) when higher,
+    the metrics of the json module are not compared
+    :param baseline:
+    :param results:
+    :param threshold: allowed relative change, e.g. 0.1 for 10%
+    :return: descriptions of the regressions
+    """
+    regressions = []
+    for name, metrics in results['benchmarks'].items():
+        baseline_metrics = baseline['benchmarks'].get(name, {})
+        for metric, value in metrics.items():
+            old = baseline_metrics.get(metric)
+            if old is None or metric.startswith('json_') or not old:
+                continue
+            if metric.endswith('_mb_s'):
+                change = (old - value) / old
+            elif metric.endswith(('_bytes', '_us')):
+                change = (value - old) / old
+            else:
+                continue
+            if change > threshold:
+                regressions.append(f"{name}.{metric}: {old:.6g} -> {value:.6g} ({change:.1%} worse)")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark leptjson against the json module.')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--output', help='write the results to this file instead of printing them')
+    parser.add_argument('--baseline', help='results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    arguments = parser.parse_args(argv)
+    results = run(arguments.repeat, arguments.scale)
+    text = json.dumps(results, indent=2)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+    if arguments.baseline:
+        with open(arguments.baseline, encoding='utf-8') as file:
+            regressions = compare(json.load(file), results, arguments.threshold)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,25 +5,168 @@ Implementation of json
 JSON Standard: https://tools.ietf.org/html/rfc7159.html
 Inspired by https://zhuanlan.zhihu.com/json-tutorial
 """
-from typing import Union, Optional, Any
-from string import hexdigits
+import array
+import asyncio
+import codecs
+import concurrent.futures
+import dataclasses
+import io
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import types
+import typing
+from functools import partial
+from itertools import islice
+from math import copysign, inf, isinf
+from collections import OrderedDict, deque
+from collections.abc import Mapping, Sequence
+from typing import Union, Optional, Any, AsyncIterable, AsyncIterator, BinaryIO, Callable, Iterable, \
+    Iterator, TextIO
 
 JsonBasicType = Union[str, float, None, bool, list['JsonBasicType'], dict[str, 'JsonBasicType']]
-POSITIVE_INTEGERS_SET = set('123456789')
-NONNEGATIVE_INTEGERS_SET = set('0123456789')
-JSON_SPACE_CHARACTERS_SET = set(' \t\n\r')
+# json text, utf-8 encoded unless it is a str
+JsonSource = Union[str, bytes, bytearray, memoryview, mmap.mmap]
+# (event, value, path) reported by iter_events
+JsonEvent = tuple[str, JsonBasicType, tuple[Union[str, int], ...]]
+# steps of a compiled selector: a key, an index, or None for any key or index
+SelectorSteps = tuple[Union[str, int, None], ...]
+WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+# a run of characters that can be copied verbatim into a string value
+STRING_CHUNK_RE = re.compile(r'[^"\\\x00-\x1f]*')
+NUMBER_RE = re.compile(r'-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?')
+HEX4_RE = re.compile(r'[0-9a-fA-F]{4}')
+# the colon between an object member name and its value, with the whitespace around it
+NAME_SEPARATOR_RE = re.compile(r'[ \t\n\r]*:[ \t\n\r]*')
+# characters that matter when skimming over a string without decoding it
+STRING_SPECIAL_RE = re.compile(r'["\\]')
+# the rest of a number or literal, which ends at whitespace or punctuation
+SCALAR_RE = re.compile(r'[^ \t\n\r\[\]{},:"]*')
+STRING_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+# an array made only of numbers, from its opening bracket
+NUMERIC_ARRAY_RE = re.compile(r'\[[ \t\n\r]*({0}(?:[ \t\n\r]*,[ \t\n\r]*{0})*)[ \t\n\r]*\]'.format(
+    r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?'))
+# number of elements removed or added beyond which diff stops aligning the elements
+# of two arrays, and compares them pairwise
+DIFF_MAX_ALIGN_EDITS = 100
+# a JSON Pointer token naming an array element, and the escapes a pointer may not have
+POINTER_INDEX_RE = re.compile(r'0|[1-9][0-9]*')
+POINTER_INVALID_ESCAPE_RE = re.compile(r'~(?![01])')
+# text up to the next bracket outside strings
+SKIP_RE = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+SELECTOR_STEP_RE = re.compile(r'(?:^|\.)([^.\[\]]+)|\[(\*|[0-9]+)\]')
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# number of bytes async_iter_parse feeds to its decoder between returns to the event loop
+ASYNC_SLICE_SIZE = 8 * 1024
+# number of bytes of newline-delimited json parsed by one task of parse_many
+DEFAULT_SHARD_SIZE = 1024 * 1024
+# maximum number of nested arrays and objects
+DEFAULT_MAX_DEPTH = 10000
+# binary format of dumpb and loadb: the magic bytes, a flags byte, the key
+# dictionary if flagged, then the value as a tag byte followed by its data
+BINARY_MAGIC = b'LJB\x01'
+BINARY_KEY_DICTIONARY = 0x01
+BINARY_NULL, BINARY_FALSE, BINARY_TRUE, BINARY_FLOAT, BINARY_INTEGRAL_FLOAT, BINARY_INT, \
+    BINARY_STRING, BINARY_ARRAY, BINARY_OBJECT = range(9)
+BINARY_FLOAT_STRUCT = struct.Struct('<d')
+# integral floats smaller than this are stored as varints of at most 7 bytes
+BINARY_INTEGRAL_FLOAT_LIMIT = 2.0 ** 48
+# number of characters either side of an error in LeptJsonParseError.excerpt
+ERROR_EXCERPT_LENGTH = 20
+# bounds of the results cached by a CachedDecoder
+DEFAULT_CACHE_ENTRIES = 1024
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# maximum number of distinct object keys cached by a Decoder
+DEFAULT_KEY_CACHE_SIZE = 64 * 1024
+# what parse does with a key repeated within an object
+DUPLICATE_KEY_POLICIES = ('last', 'first', 'error', 'collect')
+# number of pieces iter_stringify gathers before joining them into a chunk
+STRINGIFY_FLUSH_PIECES = 1024
+# number of times in a row a value may be converted by encoders or default,
+# beyond which they are taken to convert back and forth forever
+MAX_CONVERSIONS = 100
+# marks an exhausted iterator
+_NO_MEMBER = object()
+# methods of _Scanner timed by ParseStats, and the names of their productions
+_INSTRUMENTED_PRODUCTIONS = {'_parse_whitespace': 'whitespace', '_parse_string': 'string',
+                             '_parse_escape_character': 'escape', '_parse_key': 'key',
+                             '_parse_number': 'number', '_parse_numeric_array': 'number',
+                             '_parse_literal': 'literal'}
+# subclasses of the scanners made by _instrumented
+_INSTRUMENTED_SCANNERS: dict[type, type] = {}
+SCALAR_EVENTS = {'"': 'string', 'n': 'null', 't': 'boolean', 'f': 'boolean'}
 ESCAPE_CHARACTER_MAPPING = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n',
                             'r': '\r', 't': '\t'}
+# characters stringify has to escape, a lone surrogate can not be encoded as utf-8
+ESCAPE_RE = re.compile(r'["\\\x00-\x1f\ud800-\udfff]')
+ESCAPE_ASCII_RE = re.compile(r'["\\]|[^\x20-\x7e]')
+STRINGIFY_ESCAPES = {chr(char_ord): '\\u{0:04x}'.format(char_ord) for char_ord in range(0x20)}
+STRINGIFY_ESCAPES.update({'"': '\\"', '\\': '\\\\', '\b': '\\b', '\f': '\\f', '\n': '\\n',
+                          '\r': '\\r', '\t': '\\t'})
 
 
 class LeptJsonParseError(Exception):
     """
     Raised when encountering json string parsing error
+
+    pos is the offset of the error in the parsed text, in characters for str and
+    in bytes otherwise, and lineno and colno its line and column, counted from 1;
+    excerpt is the text around it. When parsing newline-delimited json, lineno is
+    the line of the failing record in the file, byte_offset the offset of that
+    line, None for files read in text mode, and pos and colno are positions within
+    the line.
     """
 
-    def __init__(self, msg: str):
-        super(LeptJsonParseError, self).__init__(msg)
+    def __init__(self, msg: str, lineno: Optional[int] = None,
+                 byte_offset: Optional[int] = None, colno: Optional[int] = None,
+                 pos: Optional[int] = None, excerpt: Optional[str] = None):
         self.msg = msg
+        self.lineno = lineno
+        self.byte_offset = byte_offset
+        self.colno = colno
+        self.pos = pos
+        self.excerpt = excerpt
+        super(LeptJsonParseError, self).__init__(self._describe())
+
+    def __reduce__(self) -> tuple:
+        return type(self), (self.msg, self.lineno, self.byte_offset, self.colno, self.pos,
+                            self.excerpt)
+
+    def _describe(self) -> str:
+        if self.lineno is None:
+            return self.msg
+        location = f"line {self.lineno}"
+        if self.colno is not None:
+            location += f" column {self.colno}"
+        if self.byte_offset is not None:
+            location += f" (byte offset {self.byte_offset})"
+        if self.excerpt is not None:
+            location += f" near {self.excerpt!r}"
+        return f"{self.msg}: {location}"
+
+    def _in_record(self, lineno: int, byte_offset: Optional[int]) -> 'LeptJsonParseError':
+        """
+        :param lineno: line of the record in a newline-delimited file
+        :param byte_offset: offset of the line in the file
+        :return: the same error, located in the file
+        """
+        return LeptJsonParseError(self.msg, lineno, byte_offset, self.colno, self.pos, self.excerpt)
+
+    def _after(self, position: int, lineno: int, colno: int) -> 'LeptJsonParseError':
+        """
+        :param position: offset of the parsed text in a longer input
+        :param lineno: line of the parsed text in the input
+        :param colno: column of the parsed text in its line
+        :return: the same error, located in the input
+        """
+        if self.lineno is None:
+            return self
+        return LeptJsonParseError(self.msg, self.lineno + lineno - 1, self.byte_offset,
+                                  self.colno + colno - 1 if self.lineno == 1 else self.colno,
+                                  self.pos + position, self.excerpt)
 
 
 class LeptJsonStringifyError(Exception):
@@ -36,84 +179,1803 @@ class LeptJsonStringifyError(Exception):
         self.msg = msg
 
 
-class _String:
-    def __init__(self, string: str):
-        self._string = string
+class LeptJsonPatchError(Exception):
+    """
+    Raised when a patch can not be applied; index is the position of the failing
+    operation in a JSON Patch
+    """
 
-    def __getitem__(self, item: int|slice[int, int, None]):
-        try:
-            return self._string[item]
-        except IndexError:
-            return ''
+    def __init__(self, msg: str, index: Optional[int] = None):
+        self.msg = msg
+        self.index = index
+        super().__init__(msg if index is None else f"{msg}: operation {index}")
+
+    def __reduce__(self) -> tuple:
+        return type(self), (self.msg, self.index)
 
 
-def parse(string: str) -> JsonBasicType:
+def parse(string: JsonSource, select: Optional[Iterable[str]] = None,
+          max_depth: int = DEFAULT_MAX_DEPTH, parse_float: Optional[Callable[[str], Any]] = None,
+          parse_int: Optional[Callable[[str], Any]] = None,
+          stats: Optional['ParseStats'] = None, numeric_arrays: bool = False,
+          duplicate_keys: str = 'last') -> JsonBasicType:
     """
     deserialize a json string into python object
-    :param json_string:
+    :param string: str, or utf-8 encoded bytes-like object such as a memory-mapped file;
+        bytes and mmap are scanned in place and only their string values are decoded
+    :param select: paths such as "statuses[*].user.id", where "*" matches any key or index;
+        when given, only the values matched by the paths are built
+    :return: the python object, or a dict from each path in select to the list of values
+        it matches, in document order
+    :param max_depth: maximum number of nested arrays and objects
+    :param parse_float: called with the text of every number with a fraction or exponent,
+        e.g. decimal.Decimal; by default numbers are parsed as float
+    :param parse_int: called with the text of every integral number, e.g. int to keep
+        large integers exact; by default they are parsed as float
+    :param stats: ParseStats to which the counts and times of this parse are added;
+        parsing is only instrumented when given
+    :param numeric_arrays: return arrays made only of numbers as array.array('d'), which
+        stores them unboxed in 8 bytes each; ignored when parse_float or parse_int is given
+    :param duplicate_keys: what to do with a key repeated within an object: keep the "last"
+        or the "first" value, raise an "error", or "collect" every member of the object,
+        in order, into an ObjectPairs in place of the dict
+    """
+    return Decoder(max_depth, parse_float, parse_int, stats=stats, numeric_arrays=numeric_arrays,
+                   duplicate_keys=duplicate_keys).parse(string, select)
+
+
+def load(path: Union[str, os.PathLike], select: Optional[Iterable[str]] = None,
+         max_depth: int = DEFAULT_MAX_DEPTH, parse_float: Optional[Callable[[str], Any]] = None,
+         parse_int: Optional[Callable[[str], Any]] = None,
+         stats: Optional['ParseStats'] = None, numeric_arrays: bool = False,
+         duplicate_keys: str = 'last') -> JsonBasicType:
+    """
+    deserialize a utf-8 encoded json file, parsed in place through a memory map;
+    the other parameters are the same as for parse
+    :param path:
+    :return:
+    """
+    return Decoder(max_depth, parse_float, parse_int, stats=stats, numeric_arrays=numeric_arrays,
+                   duplicate_keys=duplicate_keys).load(path, select)
+
+
+def parse_lazy(string: JsonSource, max_depth: int = DEFAULT_MAX_DEPTH) \
+        -> Union[JsonBasicType, 'LazyObject', 'LazyArray']:
+    """
+    deserialize a json string into read-only views, which parse the members of an
+    object or array on first access; errors inside an object or array are raised
+    when it is first accessed
+    :param string:
+    :param max_depth: maximum number of nested arrays and objects
+    :return: LazyObject or LazyArray for an object or array, else the python object
+    """
+    return _make_scanner(string, max_depth).parse_lazy()
+
+
+def iter_events(string: JsonSource, max_depth: int = DEFAULT_MAX_DEPTH) \
+        -> Iterator[JsonEvent]:
+    """
+    deserialize a json string into a stream of events, without building
+    any list or dict
+    :param string:
+    :param max_depth: maximum number of nested arrays and objects
+    :return: iterator over (event, value, path) tuples, where event is one of
+        null, boolean, number, string, map_key, start_map, end_map, start_array
+        and end_array, and path holds the keys and indexes leading to the value
+    """
+    return _make_scanner(string, max_depth).iter_events()
+
+
+def iter_parse(source: Union[str, os.PathLike, BinaryIO, TextIO], skip_errors: bool = False,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[JsonBasicType]:
+    """
+    lazily deserialize a newline-delimited json file, one json value per line
+    :param source: path of the file, or a file object opened in binary or text mode
+    :param skip_errors: skip lines that cannot be parsed instead of raising
+    :param chunk_size: number of bytes (or characters in text mode) read at a time
+    :return: iterator over the parsed values, blank lines are ignored
+    """
+    return Decoder().iter_parse(source, skip_errors, chunk_size)
+
+
+async def async_iter_parse(reader: Union[asyncio.StreamReader, AsyncIterable[bytes]],
+                           chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           executor: Optional[concurrent.futures.Executor] = None,
+                           max_depth: int = DEFAULT_MAX_DEPTH,
+                           parse_float: Optional[Callable[[str], Any]] = None,
+                           parse_int: Optional[Callable[[str], Any]] = None) \
+        -> AsyncIterator[JsonBasicType]:
+    """
+    deserialize a stream of concatenated or newline-delimited json values read
+    from an asyncio stream, yielding each value as soon as it is complete;
+    chunks are parsed ASYNC_SLICE_SIZE bytes at a time, and control returns to
+    the event loop after every slice
+    :param reader: asyncio.StreamReader, or any object with an async read method, or
+        any async iterable of utf-8 encoded chunks
+    :param chunk_size: number of bytes read at a time from a reader with a read method
+    :param executor: when given, chunks are fed to the decoder in it, e.g. a
+        ThreadPoolExecutor, so that parsing a large value does not block the event loop
+    :param max_depth: maximum number of nested arrays and objects
+    :param parse_float: see parse
+    :param parse_int: see parse
+    :return: async iterator over the parsed values
+    """
+    decoder = IncrementalDecoder(multiple=True, max_depth=max_depth, parse_float=parse_float,
+                                 parse_int=parse_int)
+    loop = asyncio.get_running_loop()
+    if hasattr(reader, 'read'):
+        # asyncio.StreamReader, or a file of aiofiles
+        chunks = _iter_stream_reader(reader, chunk_size)
+    else:
+        chunks = aiter(reader)
+    async for chunk in chunks:
+        if executor is None:
+            for start in range(0, len(chunk), ASYNC_SLICE_SIZE):
+                for value in decoder.feed(chunk[start:start + ASYNC_SLICE_SIZE]):
+                    yield value
+                await asyncio.sleep(0)
+        else:
+            for value in await loop.run_in_executor(executor, decoder.feed, chunk):
+                yield value
+    for value in decoder.close():
+        yield value
+
+
+def parse_many(source: Union[str, os.PathLike, Iterable[Union[str, bytes]]],
+               workers: Optional[int] = None, ordered: bool = True,
+               shard_size: int = DEFAULT_SHARD_SIZE, skip_errors: bool = False,
+               max_depth: int = DEFAULT_MAX_DEPTH, parse_float: Optional[Callable[[str], Any]] = None,
+               parse_int: Optional[Callable[[str], Any]] = None) -> Iterator[JsonBasicType]:
+    """
+    deserialize newline-delimited json, one json value per line, in a pool of processes;
+    a file is split into shards of about shard_size bytes on line boundaries, each parsed
+    by one process, which sends back the values of the whole shard at once
+    :param source: path of the file, or an iterable of lines which are sent to the
+        processes in batches of about shard_size characters or bytes
+    :param workers: number of processes, by default the number of cpus; 1 parses in
+        this process
+    :param ordered: yield the values in the order of the lines; otherwise the values of
+        each shard are yielded as soon as it is parsed
+    :param shard_size:
+    :param skip_errors: skip lines that cannot be parsed instead of raising
+    :param max_depth: maximum number of nested arrays and objects
+    :param parse_float: see parse, must be picklable
+    :param parse_int: see parse, must be picklable
+    :return: iterator over the parsed values, blank lines are ignored
+    """
+    options = (max_depth, parse_float, parse_int, skip_errors)
+    if isinstance(source, (str, os.PathLike)):
+        size = os.path.getsize(source)
+        tasks = ((_parse_shard, source, start, min(start + shard_size, size), options)
+                 for start in range(0, size, shard_size))
+    else:
+        tasks = ((_parse_batch, batch, lineno, options)
+                 for lineno, batch in _batch_lines(source, shard_size))
+    for values in _run_tasks(tasks, workers, ordered):
+        yield from values
+
+
+def parse_parallel(string: JsonSource, workers: Optional[int] = None,
+                   shard_size: int = DEFAULT_SHARD_SIZE, max_depth: int = DEFAULT_MAX_DEPTH,
+                   parse_float: Optional[Callable[[str], Any]] = None,
+                   parse_int: Optional[Callable[[str], Any]] = None) -> JsonBasicType:
+    """
+    deserialize a json string whose root is a huge array in a pool of processes;
+    the elements are split into ranges of about shard_size characters or bytes by
+    a skim balancing quotes and brackets, the ranges are parsed in parallel and
+    joined into one list; errors are the same as those raised by parse
+    :param string: see parse
+    :param workers: number of processes, by default the number of cpus
+    :param shard_size:
+    :param max_depth: maximum number of nested arrays and objects
+    :param parse_float: see parse, must be picklable
+    :param parse_int: see parse, must be picklable
+    :return: the python object; a root which is not an array, or an array whose
+        elements are not arrays or objects, is parsed in this process
+    """
+    scanner = _make_scanner(string, max_depth, parse_float, parse_int)
+    workers = workers or os.cpu_count() or 1
+    segments = scanner._split_array(shard_size) if workers > 1 else None
+    if segments is None or len(segments) == 1:
+        return scanner.parse()
+    text = scanner._string
+    options = (max_depth, parse_float, parse_int)
+    tasks = ((_parse_segment, scanner.BEGIN_ARRAY + text[start:end] + scanner.END_ARRAY, options)
+             for start, end in segments)
+    result: list[JsonBasicType] = []
+    try:
+        for values in _run_tasks(tasks, workers, True):
+            result.extend(values)
+    except LeptJsonParseError:
+        # parse the whole string again, so that the error is reported
+        # relative to it rather than to a range
+        return scanner.parse()
+    return result
+
+
+def _run_tasks(tasks: Iterator[tuple], workers: Optional[int], ordered: bool) -> Iterator[Any]:
+    """
+    run tasks in a pool of processes
+    :param tasks: tuples of a module-level function and its arguments
+    :param workers: number of processes, by default the number of cpus; 1 runs the
+        tasks in this process
+    :param ordered: yield the results in the order of the tasks, instead of as they complete
+    :return: iterator over the results of the tasks
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for function, *arguments in tasks:
+            yield function(*arguments)
+        return
+    executor = concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        # keep every process busy without reading all the tasks ahead
+        pending = deque(executor.submit(*task) for task in islice(tasks, 2 * workers))
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done_set, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                done = [future for future in pending if future in done_set]
+                for future in done:
+                    pending.remove(future)
+            for future in done:
+                pending.extend(executor.submit(*task) for task in islice(tasks, 1))
+                yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+class Decoder:
+    """
+    Reusable deserializer holding the parse options.
+
+    Object keys are cached across every document it parses, so keys repeated
+    from one document to the next, as in a stream of records, are decoded once
+    and all the parsed dicts share the same str objects.
+
+    >>> decoder = Decoder(parse_int=int)
+    >>> first, second = decoder.parse('{"id": 1}'), decoder.parse('{"id": 2}')
+    >>> next(iter(first)) is next(iter(second))
+    True
+    """
+
+    def __init__(self, max_depth: int = DEFAULT_MAX_DEPTH,
+                 parse_float: Optional[Callable[[str], Any]] = None,
+                 parse_int: Optional[Callable[[str], Any]] = None,
+                 key_cache_size: int = DEFAULT_KEY_CACHE_SIZE,
+                 stats: Optional['ParseStats'] = None, numeric_arrays: bool = False,
+                 duplicate_keys: str = 'last'):
+        """
+        :param max_depth: maximum number of nested arrays and objects
+        :param parse_float: see parse
+        :param parse_int: see parse
+        :param key_cache_size: maximum number of distinct keys cached, keys seen
+            once the cache is full are decoded every time
+        :param stats: see parse
+        :param numeric_arrays: see parse
+        :param duplicate_keys: see parse
+        """
+        if duplicate_keys not in DUPLICATE_KEY_POLICIES:
+            raise ValueError(f"invalid duplicate_keys {duplicate_keys!r}")
+        self._max_depth = max_depth
+        self._parse_float = parse_float
+        self._parse_int = parse_int
+        self._key_cache_size = key_cache_size
+        self._keys: dict[Any, str] = {}
+        self._stats = stats
+        self._numeric_arrays = numeric_arrays
+        self._duplicate_keys = duplicate_keys
+
+    def parse(self, string: JsonSource, select: Optional[Iterable[str]] = None) -> JsonBasicType:
+        """
+        the same as the parse function
+        :param string:
+        :param select:
+        :return:
+        """
+        scanner = _make_scanner(string, self._max_depth, self._parse_float, self._parse_int,
+                                self._keys, self._key_cache_size, self._stats, self._numeric_arrays,
+                                self._duplicate_keys)
+        if self._stats is not None:
+            return self._stats._record(string, scanner, select)
+        if select is not None:
+            return scanner.select(select)
+        return scanner.parse()
+
+    def load(self, path: Union[str, os.PathLike],
+             select: Optional[Iterable[str]] = None) -> JsonBasicType:
+        """
+        the same as the load function
+        :param path:
+        :param select:
+        :return:
+        """
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                # an empty file cannot be memory-mapped
+                return self.parse(b'', select)
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+                return self.parse(memory, select)
+
+    def iter_parse(self, source: Union[str, os.PathLike, BinaryIO, TextIO], skip_errors: bool = False,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[JsonBasicType]:
+        """
+        the same as the iter_parse function
+        :param source:
+        :param skip_errors:
+        :param chunk_size:
+        :return:
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as file:
+                yield from self.iter_parse(file, skip_errors, chunk_size)
+            return
+        yield from self._parse_lines(_iter_lines(source, chunk_size), skip_errors)
+
+    def _parse_lines(self, lines: Iterable[tuple[int, Optional[int], Union[str, bytes]]],
+                     skip_errors: bool) -> Iterator[JsonBasicType]:
+        """
+        :param lines: tuples of line number, offset of the line and the line itself
+        :param skip_errors:
+        :return: iterator over the values of the lines which are not blank
+        """
+        for lineno, offset, line in lines:
+            # bytes are parsed without decoding the line first,
+            # so that the cached keys are not decoded again
+            scanner_class = _BytesScanner if isinstance(line, bytes) else _Scanner
+            if scanner_class.WHITESPACE_RE.fullmatch(line):
+                continue
+            try:
+                result = self.parse(line)
+            except LeptJsonParseError as error:
+                if skip_errors:
+                    continue
+                raise error._in_record(lineno, offset) from None
+            yield result
+
+
+class CachedDecoder:
+    """
+    Decoder returning the same result for the same json text without parsing it again.
+
+    Results are cached by the text itself, least recently used first out once
+    there are more than max_entries of them, or more than max_bytes by estimate.
+    A cached result is shared by every caller that parses its text: pass
+    frozen=True to get FrozenDict, FrozenList, FrozenObjectPairs and FrozenArray
+    containers, which are equal to the ones parse returns but cannot be modified.
+
+    >>> decoder = CachedDecoder(frozen=True)
+    >>> decoder.parse('{"a": [1]}') is decoder.parse('{"a": [1]}')
+    True
+    >>> decoder.hits, decoder.misses
+    (1, 1)
+    """
+
+    def __init__(self, decoder: Optional[Decoder] = None, max_entries: int = DEFAULT_CACHE_ENTRIES,
+                 max_bytes: int = DEFAULT_CACHE_BYTES, frozen: bool = False):
+        """
+        :param decoder: parses the texts missing from the cache, by default Decoder()
+        :param max_entries: maximum number of cached results
+        :param max_bytes: maximum estimated memory of the cached texts and results
+        :param frozen: cache immutable results
+        """
+        self._decoder = Decoder() if decoder is None else decoder
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._frozen = frozen
+        # text -> (result, estimated bytes), least recently used first
+        self._entries: OrderedDict[Union[str, bytes], tuple[JsonBasicType, int]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def parse(self, string: JsonSource) -> JsonBasicType:
+        """
+        :param string: see parse
+        :return: the cached result for string, or the result of parsing it
+        """
+        key = string if isinstance(string, (str, bytes)) else bytes(string)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+        self.misses += 1
+        result = self._decoder.parse(key)
+        if self._frozen:
+            result = _copy_tree(result, FrozenDict, FrozenList, FrozenObjectPairs, FrozenArray)
+        size = sys.getsizeof(key) + _estimate_size(result)
+        if size <= self._max_bytes and self._max_entries > 0:
+            self._entries[key] = (result, size)
+            self.bytes += size
+            while len(self._entries) > self._max_entries or self.bytes > self._max_bytes:
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+        return result
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+
+class ObjectPairs(list):
+    """
+    members of an object with repeated keys, as a list of (key, value) pairs in
+    document order; returned by parse with duplicate_keys="collect" in place of the
+    dict, and serialized back as an object by stringify
+
+    >>> parse('{"a": 1, "b": 2, "a": 3}', duplicate_keys='collect')
+    ObjectPairs([('a', 1.0), ('b', 2.0), ('a', 3.0)])
+    """
+
+    def items(self) -> Iterator[tuple[str, JsonBasicType]]:
+        return iter(self)
+
+    def getall(self, key: str) -> list[JsonBasicType]:
+        """
+        :param key:
+        :return: values of every member named key, in order
+        """
+        return [value for member_key, value in self if member_key == key]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list.__repr__(self)})"
+
+
+class FrozenDict(dict):
+    """
+    dict which cannot be modified, returned by CachedDecoder(frozen=True)
+    """
+
+    def _frozen(self, *arguments: Any, **keywords: Any) -> None:
+        raise TypeError(f"{type(self).__name__} cannot be modified")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _frozen
+
+    def __reduce__(self) -> tuple:
+        return type(self), (dict(self),)
+
+
+class FrozenList(list):
+    """
+    list which cannot be modified, returned by CachedDecoder(frozen=True)
+    """
+
+    def _frozen(self, *arguments: Any, **keywords: Any) -> None:
+        raise TypeError(f"{type(self).__name__} cannot be modified")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = append = clear = extend = insert = pop = \
+        remove = reverse = sort = _frozen
+
+    def __reduce__(self) -> tuple:
+        return type(self), (list(self),)
+
+
+class FrozenObjectPairs(FrozenList, ObjectPairs):
+    """
+    ObjectPairs which cannot be modified, returned by CachedDecoder(frozen=True)
+    """
+
+
+class FrozenArray(array.array):
+    """
+    array.array which cannot be modified, returned by CachedDecoder(frozen=True)
+    for the numeric arrays of Decoder(numeric_arrays=True)
+    """
+
+    def _frozen(self, *arguments: Any, **keywords: Any) -> None:
+        raise TypeError(f"{type(self).__name__} cannot be modified")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = append = byteswap = extend = frombytes = \
+        fromfile = fromlist = fromunicode = insert = pop = remove = reverse = _frozen
+
+
+def _copy_tree(value: JsonBasicType, dict_type: type = dict, list_type: type = list,
+               pairs_type: type = ObjectPairs, array_type: type = array.array) -> JsonBasicType:
+    """
+    :param value:
+    :param dict_type: type of the copies of dicts, e.g. FrozenDict
+    :param list_type: type of the copies of lists
+    :param pairs_type: type of the copies of ObjectPairs
+    :param array_type: type of the copies of numeric array.array
+    :return: deep copy of the dicts, lists, ObjectPairs and numeric arrays of value
+    """
+    if isinstance(value, array.array):
+        return array_type(value.typecode, value)
+    if not isinstance(value, (dict, list)):
+        return value
+    # every container, parents before their members
+    containers = []
+    stack = [value]
+    while stack:
+        container = stack.pop()
+        containers.append(container)
+        if isinstance(container, dict):
+            members = container.values()
+        elif isinstance(container, ObjectPairs):
+            members = [member for _, member in container]
+        else:
+            members = container
+        stack.extend(member for member in members if isinstance(member, (dict, list, array.array)))
+    copies: dict[int, JsonBasicType] = {}
+    for container in reversed(containers):
+        if isinstance(container, dict):
+            copies[id(container)] = dict_type(
+                (key, copies.get(id(member), member)) for key, member in container.items())
+        elif isinstance(container, ObjectPairs):
+            copies[id(container)] = pairs_type(
+                (key, copies.get(id(member), member)) for key, member in container)
+        elif isinstance(container, array.array):
+            copies[id(container)] = array_type(container.typecode, container)
+        else:
+            copies[id(container)] = list_type(copies.get(id(member), member) for member in container)
+    return copies[id(value)]
+
+
+def _estimate_size(value: JsonBasicType) -> int:
+    """
+    :param value:
+    :return: memory held by value, counting keys and values shared with other values too
+    """
+    size = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            size += sum(sys.getsizeof(key) for key in value)
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            # including the (key, value) pairs of ObjectPairs
+            stack.extend(value)
+    return size
+
+
+def compile_decoder(schema: Union[dict[str, Any], type]) -> 'SchemaDecoder':
+    """
+    compile a schema into a decoder specialized for the documents it describes
+    :param schema: a JSON Schema made of the keywords type ("object", "array", "string",
+        "number", "integer", "boolean", "null", or a pair of one of them and "null"),
+        properties, required, additionalProperties and items; or a dataclass, or a
+        class with __slots__ and annotated attributes, whose instances are built
+    :return:
+    """
+    return SchemaDecoder(_compile_schema(schema))
+
+
+class SchemaDecoder:
+    """
+    Parser specialized for documents of one schema, made by compile_decoder.
+
+    The members of an object are expected in the order of the schema, so each key
+    is checked against the expected one instead of being decoded, and each value
+    is parsed by the production its type calls for, checking the type on the way.
+    A document which deviates, by its order of keys, its layout or its types, is
+    parsed again by the generic parser, and then checked against the schema.
+
+    >>> decoder = compile_decoder({'type': 'object', 'properties': {'id': {'type': 'integer'}}})
+    >>> decoder.parse('{"id": 1, "name": "a"}')
+    {'id': 1.0, 'name': 'a'}
+    """
+
+    def __init__(self, node: '_SchemaNode'):
+        self._node = node
+        # object keys shared by every document, as in Decoder
+        self._keys: dict[Any, str] = {}
+
+    def parse(self, string: JsonSource) -> Any:
+        """
+        :param string: see parse
+        :return: the python object, dicts and lists as parse returns them unless the
+            schema is a class, whose instances take the place of objects
+        :raise LeptJsonParseError: "lept parse schema mismatch" when the document is
+            valid json but does not match the schema
+        """
+        scanner = _make_scanner(string, keys=self._keys)
+        try:
+            value, current_index = self._node.decode(scanner, scanner._parse_whitespace(0))
+            if scanner._parse_whitespace(current_index) == len(scanner._string):
+                return value
+        except (_SchemaMismatch, LeptJsonParseError):
+            pass
+        value = scanner.parse()
+        try:
+            return self._node.build(value)
+        except _SchemaMismatch as mismatch:
+            raise LeptJsonParseError(f"lept parse schema mismatch: {mismatch}") from None
+
+
+class _SchemaMismatch(Exception):
+    """
+    Raised by schema nodes when a document deviates from the schema
+    """
+
+
+class _SchemaNode:
+    """
+    Part of a compiled schema, describing one json value.
+
+    decode parses the value at a position of a scanner, expecting the schema's layout;
+    build checks and converts the value built by the generic parser instead.
+    """
+
+    def decode(self, scanner: '_Scanner', current_index: int) -> tuple[Any, int]:
+        return scanner._parse_value(current_index)
+
+    def build(self, value: JsonBasicType) -> Any:
+        return value
+
+
+class _StringNode(_SchemaNode):
+    def decode(self, scanner: '_Scanner', current_index: int) -> tuple[Any, int]:
+        if scanner._string[current_index:current_index + 1] != scanner.QUOTE:
+            raise _SchemaMismatch("expect string")
+        return scanner._parse_string(current_index)
+
+    def build(self, value: JsonBasicType) -> Any:
+        if not isinstance(value, str):
+            raise _SchemaMismatch("expect string")
+        return value
+
+
+class _NumberNode(_SchemaNode):
+    def __init__(self, integer: bool, cast: Optional[type]):
+        """
+        :param integer: only accept integral numbers
+        :param cast: int or float for the attributes of classes, None to keep numbers as
+            parse returns them
+        """
+        self._integer = integer
+        self._cast = cast
+
+    def decode(self, scanner: '_Scanner', current_index: int) -> tuple[Any, int]:
+        if self._cast is int:
+            # integers are converted from their token, which keeps big ones exact
+            match = scanner.NUMBER_RE.match(scanner._string, current_index)
+            if match is not None and match.groups() == (None, None):
+                return int(scanner._decode(current_index, match.end())), match.end()
+        value, current_index = scanner._parse_number(current_index)
+        return self.build(value), current_index
+
+    def build(self, value: JsonBasicType) -> Any:
+        if not isinstance(value, float) or (self._integer and not value.is_integer()):
+            raise _SchemaMismatch("expect integer" if self._integer else "expect number")
+        return value if self._cast is None else self._cast(value)
+
+
+class _LiteralNode(_SchemaNode):
+    def __init__(self, values: tuple[Optional[bool], ...], description: str):
+        """
+        :param values: the values of the literals accepted, None, True or False
+        :param description:
+        """
+        self._values = values
+        self._description = description
+
+    def decode(self, scanner: '_Scanner', current_index: int) -> tuple[Any, int]:
+        element = scanner._string[current_index:current_index + 1]
+        if element not in scanner.LITERALS or scanner.LITERALS[element][1] not in self._values:
+            raise _SchemaMismatch(f"expect {self._description}")
+        return scanner._parse_literal(current_index, *scanner.LITERALS[element])
+
+    def build(self, value: JsonBasicType) -> Any:
+        if not any(value is accepted for accepted in self._values):
+            raise _SchemaMismatch(f"expect {self._description}")
+        return value
+
+
+class _OptionalNode(_SchemaNode):
+    def __init__(self, node: _SchemaNode):
+        """
+        :param node: schema of the value when it is not null
+        """
+        self._node = node
+
+    def decode(self, scanner: '_Scanner', current_index: int) -> tuple[Any, int]:
+        if scanner._string[current_index:current_index + 1] == scanner.LITERAL_NULL[:1]:
+            return scanner._parse_literal(current_index, scanner.LITERAL_NULL, None)
+        return self._node.decode(scanner, current_index)
+
+    def build(self, value: JsonBasicType) -> Any:
+        return None if value is None else self._node.build(value)
+
+
+class _ArrayNode(_SchemaNode):
+    def __init__(self, items: _SchemaNode):
+        self._items = items
+
+    def decode(self, scanner: '_Scanner', current_index: int) -> tuple[Any, int]:
+        string = scanner._string
+        if string[current_index:current_index + 1] != scanner.BEGIN_ARRAY:
+            raise _SchemaMismatch("expect array")
+        result = []
+        current_index = scanner._parse_whitespace(current_index + 1)
+        if string[current_index:current_index + 1] == scanner.END_ARRAY:
+            return result, current_index + 1
+        items = self._items
+        while True:
+            value, current_index = items.decode(scanner, current_index)
+            result.append(value)
+            current_index = scanner._parse_whitespace(current_index)
+            element = string[current_index:current_index + 1]
+            if element == scanner.VALUE_SEPARATOR:
+                current_index = scanner._parse_whitespace(current_index + 1)
+            elif element == scanner.END_ARRAY:
+                return result, current_index + 1
+            else:
+                raise _SchemaMismatch("expect comma or square bracket")
+
+    def build(self, value: JsonBasicType) -> Any:
+        if not isinstance(value, list):
+            raise _SchemaMismatch("expect array")
+        return [self._items.build(item) for item in value]
+
+
+class _ObjectNode(_SchemaNode):
+    def __init__(self, properties: dict[str, _SchemaNode], required: Iterable[str],
+                 additional: Optional[_SchemaNode], target: Optional[type] = None):
+        """
+        :param properties: schemas of the members, in their expected order
+        :param required: keys which must be present
+        :param additional: schema of the other members, None if there must be none
+        :param target: class built from the members instead of a dict; members which
+            are not properties are left out
+        """
+        self._properties = properties
+        self._required = frozenset(required)
+        self._additional = additional
+        self._target = target
+        # keys written the one way without escapes, as str and as bytes, with their
+        # schema, in the expected order; None for keys which need escapes, whose
+        # spelling may vary, and which are always parsed
+        self._expected = [(key, *_key_literals(key), node) for key, node in properties.items()]
+        self._positions = {key: position for position, key in enumerate(properties)}
+
+    def decode(self, scanner: '_Scanner', current_index: int) -> tuple[Any, int]:
+        string = scanner._string
+        if string[current_index:current_index + 1] != scanner.BEGIN_OBJECT:
+            raise _SchemaMismatch("expect object")
+        members: dict[str, Any] = {}
+        current_index = scanner._parse_whitespace(current_index + 1)
+        if string[current_index:current_index + 1] == scanner.END_OBJECT:
+            return self._finish(members), current_index + 1
+        is_bytes = not isinstance(string, str)
+        expected = self._expected
+        position = 0
+        while True:
+            if position < len(expected):
+                key, text, encoded, node = expected[position]
+                literal = encoded if is_bytes else text
+                if literal is not None and \
+                        string[current_index:current_index + len(literal)] == literal:
+                    match = scanner.NAME_SEPARATOR_RE.match(string, current_index + len(literal))
+                    if match is None:
+                        raise _SchemaMismatch("expect colon")
+                    current_index = match.end()
+                    position += 1
+                else:
+                    key, current_index = scanner._parse_key(current_index)
+                    position = self._positions.get(key, position - 1) + 1
+                    node = self._properties.get(key)
+            else:
+                key, current_index = scanner._parse_key(current_index)
+                node = self._properties.get(key)
+            if node is None:
+                if self._additional is None:
+                    raise _SchemaMismatch(f"unexpected key {key!r}")
+                node = self._additional
+                value, current_index = node.decode(scanner, current_index)
+                if self._target is None:
+                    members[key] = value
+            else:
+                members[key], current_index = node.decode(scanner, current_index)
+            current_index = scanner._parse_whitespace(current_index)
+            element = string[current_index:current_index + 1]
+            if element == scanner.VALUE_SEPARATOR:
+                current_index = scanner._parse_whitespace(current_index + 1)
+            elif element == scanner.END_OBJECT:
+                return self._finish(members), current_index + 1
+            else:
+                raise _SchemaMismatch("expect comma or curly bracket")
+
+    def build(self, value: JsonBasicType) -> Any:
+        if not isinstance(value, dict):
+            raise _SchemaMismatch("expect object")
+        members = {}
+        for key, member in value.items():
+            node = self._properties.get(key)
+            if node is None:
+                if self._additional is None:
+                    raise _SchemaMismatch(f"unexpected key {key!r}")
+                member = self._additional.build(member)
+                if self._target is not None:
+                    continue
+            else:
+                member = node.build(member)
+            members[key] = member
+        return self._finish(members)
+
+    def _finish(self, members: dict[str, Any]) -> Any:
+        if not self._required.issubset(members):
+            missing = sorted(self._required.difference(members))
+            raise _SchemaMismatch(f"missing keys {missing}")
+        if self._target is None:
+            return members
+        if dataclasses.is_dataclass(self._target):
+            return self._target(**members)
+        instance = self._target.__new__(self._target)
+        for key, member in members.items():
+            setattr(instance, key, member)
+        return instance
+
+
+def _key_literals(key: str) -> tuple[Optional[str], Optional[bytes]]:
+    """
+    :param key:
+    :return: tuple of the key as a json string, as str and as utf-8 bytes; Nones
+        if the key has characters which must be escaped
+    """
+    text = f'"{key}"'
+    if _stringify_str(key) != text:
+        return None, None
+    return text, text.encode('utf-8')
+
+
+def _compile_schema(schema: Union[dict[str, Any], type, Any]) -> _SchemaNode:
+    """
+    :param schema: a JSON Schema, or a class or type annotation
     :return:
     """
-    json_string = _String(string)
-    current_index = _parse_whitespace(json_string, 0)
-    result, current_index = _parse_value(json_string, current_index)
-    current_index = _parse_whitespace(json_string, current_index)
-    if json_string[current_index] == '':
+    if isinstance(schema, dict):
+        return _compile_json_schema(schema)
+    return _compile_annotation(schema)
+
+
+def _compile_json_schema(schema: dict[str, Any]) -> _SchemaNode:
+    schema_type = schema.get('type')
+    if isinstance(schema_type, list):
+        types = [item for item in schema_type if item != 'null']
+        if len(types) != 1 or len(schema_type) != 2:
+            raise ValueError(f"unsupported schema type {schema_type!r}")
+        return _OptionalNode(_compile_json_schema({**schema, 'type': types[0]}))
+    if schema_type is None:
+        return _SchemaNode()
+    if schema_type == 'object':
+        properties = {key: _compile_json_schema(value)
+                      for key, value in schema.get('properties', {}).items()}
+        additional = schema.get('additionalProperties', True)
+        if additional is True:
+            additional = _SchemaNode()
+        elif additional is False:
+            additional = None
+        else:
+            additional = _compile_json_schema(additional)
+        return _ObjectNode(properties, schema.get('required', ()), additional)
+    if schema_type == 'array':
+        return _ArrayNode(_compile_json_schema(schema.get('items', {})))
+    if schema_type == 'string':
+        return _StringNode()
+    if schema_type in ('number', 'integer'):
+        return _NumberNode(schema_type == 'integer', None)
+    if schema_type == 'boolean':
+        return _LiteralNode((True, False), 'boolean')
+    if schema_type == 'null':
+        return _LiteralNode((None,), 'null')
+    raise ValueError(f"unsupported schema type {schema_type!r}")
+
+
+def _compile_annotation(annotation: Any) -> _SchemaNode:
+    if annotation is Any or annotation is object:
+        return _SchemaNode()
+    if annotation is str:
+        return _StringNode()
+    if annotation is bool:
+        return _LiteralNode((True, False), 'boolean')
+    if annotation is int or annotation is float:
+        return _NumberNode(annotation is int, annotation)
+    if annotation is None or annotation is type(None):
+        return _LiteralNode((None,), 'null')
+    origin = typing.get_origin(annotation)
+    arguments = typing.get_args(annotation)
+    if origin is Union or origin is types.UnionType:
+        others = [argument for argument in arguments if argument is not type(None)]
+        if len(others) != 1 or len(arguments) != 2:
+            raise ValueError(f"unsupported annotation {annotation!r}")
+        return _OptionalNode(_compile_annotation(others[0]))
+    if annotation is list or origin is list:
+        return _ArrayNode(_compile_annotation(arguments[0]) if arguments else _SchemaNode())
+    if annotation is dict or origin is dict:
+        if arguments and arguments[0] is not str:
+            raise ValueError(f"unsupported annotation {annotation!r}")
+        return _ObjectNode({}, (), _compile_annotation(arguments[1]) if arguments else _SchemaNode())
+    if isinstance(annotation, type) and dataclasses.is_dataclass(annotation):
+        hints = typing.get_type_hints(annotation)
+        fields = [field for field in dataclasses.fields(annotation) if field.init]
+        properties = {field.name: _compile_annotation(hints[field.name]) for field in fields}
+        required = [field.name for field in fields if field.default is dataclasses.MISSING
+                    and field.default_factory is dataclasses.MISSING]
+        return _ObjectNode(properties, required, _SchemaNode(), annotation)
+    if isinstance(annotation, type) and any('__slots__' in vars(base) for base in annotation.__mro__):
+        hints = typing.get_type_hints(annotation)
+        properties = {name: _compile_annotation(hint) for name, hint in hints.items()}
+        return _ObjectNode(properties, properties, _SchemaNode(), annotation)
+    raise ValueError(f"unsupported annotation {annotation!r}")
+
+
+class ParseStats:
+    """
+    Counts and times of the productions of the parser, added up over every
+    document parsed with it.
+
+    >>> stats = ParseStats()
+    >>> parse('{"a": [1, "\\\\n"]}', stats=stats)
+    {'a': [1.0, '\\n']}
+    >>> stats.calls['string'], stats.calls['escape'], stats.objects, stats.max_depth
+    (1, 1, 1, 2)
+
+    calls and times are keyed by production: whitespace, string, escape, key,
+    number, literal, and structure for the rest of the parser, i.e. objects and
+    arrays; times are in seconds and exclude the productions called from a
+    production, e.g. the escapes in a string.
+    """
+
+    PRODUCTIONS = ('whitespace', 'string', 'escape', 'key', 'number', 'literal', 'structure')
+
+    def __init__(self):
+        self.documents = 0
+        # size of the parsed text in bytes, as utf-8 for str
+        self.bytes = 0
+        self.time = 0.0
+        self.calls: dict[str, int] = dict.fromkeys(self.PRODUCTIONS, 0)
+        self.times: dict[str, float] = dict.fromkeys(self.PRODUCTIONS, 0.0)
+        # containers built, and the deepest nesting of them
+        self.objects = 0
+        self.arrays = 0
+        self.max_depth = 0
+
+    def __repr__(self) -> str:
+        productions = ', '.join(f"{production}={self.calls[production]}/{self.times[production]:.6f}s"
+                                for production in self.PRODUCTIONS)
+        return (f"ParseStats(documents={self.documents}, bytes={self.bytes}, time={self.time:.6f}s, "
+                f"objects={self.objects}, arrays={self.arrays}, max_depth={self.max_depth}, "
+                f"{productions})")
+
+    def _record(self, string: JsonSource, scanner: '_Scanner',
+                select: Optional[Iterable[str]]) -> JsonBasicType:
+        """
+        parse with an instrumented scanner, adding its counts and times
+        :param string:
+        :param scanner:
+        :param select:
+        :return:
+        """
+        start = time.perf_counter()
+        try:
+            result = scanner.parse() if select is None else scanner.select(select)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.documents += 1
+            self.bytes += len(string.encode('utf-8', 'surrogatepass')) if isinstance(string, str) \
+                else len(scanner._string)
+            self.time += elapsed
+            self.calls['structure'] += 1
+            self.times['structure'] += elapsed - scanner._child_time
+        if select is None:
+            self._count_containers(result)
         return result
-    raise LeptJsonParseError("lept parse root not singular")
+
+    def _count_containers(self, value: JsonBasicType) -> None:
+        stack = [(value, 1)]
+        while stack:
+            value, depth = stack.pop()
+            if isinstance(value, (dict, ObjectPairs)):
+                self.objects += 1
+                values = value.values() if isinstance(value, dict) else [member for _, member in value]
+            elif isinstance(value, (list, array.array)):
+                self.arrays += 1
+                values = value
+            else:
+                continue
+            self.max_depth = max(self.max_depth, depth)
+            stack.extend((member, depth + 1) for member in values)
+
+
+def _instrumented(scanner_class: type) -> type:
+    """
+    :param scanner_class: _Scanner or _BytesScanner
+    :return: subclass of scanner_class timing its productions into scanner._stats
+    """
+    subclass = _INSTRUMENTED_SCANNERS.get(scanner_class)
+    if subclass is None:
+        namespace = {name: _timed(getattr(scanner_class, name), production)
+                     for name, production in _INSTRUMENTED_PRODUCTIONS.items()}
+        # time spent in the productions called from the one in progress
+        namespace['_child_time'] = 0.0
+        subclass = type(f"Instrumented{scanner_class.__name__}", (scanner_class,), namespace)
+        _INSTRUMENTED_SCANNERS[scanner_class] = subclass
+    return subclass
+
+
+def _timed(method: Callable, production: str) -> Callable:
+    def timed_method(self: '_Scanner', *arguments: Any) -> Any:
+        calls, times = self._stats.calls, self._stats.times
+        outer_child_time = self._child_time
+        self._child_time = 0.0
+        start = time.perf_counter()
+        try:
+            return method(self, *arguments)
+        finally:
+            elapsed = time.perf_counter() - start
+            calls[production] += 1
+            times[production] += elapsed - self._child_time
+            self._child_time = outer_child_time + elapsed
+
+    timed_method.__name__ = method.__name__
+    return timed_method
+
+
+def _make_scanner(string: JsonSource, max_depth: int = DEFAULT_MAX_DEPTH,
+                  parse_float: Optional[Callable[[str], Any]] = None,
+                  parse_int: Optional[Callable[[str], Any]] = None,
+                  keys: Optional[dict[Any, str]] = None,
+                  key_cache_size: int = DEFAULT_KEY_CACHE_SIZE,
+                  stats: Optional['ParseStats'] = None, numeric_arrays: bool = False,
+                  duplicate_keys: str = 'last') -> '_Scanner':
+    if isinstance(string, str):
+        scanner_class = _Scanner
+    else:
+        scanner_class = _BytesScanner
+        if not isinstance(string, (bytes, mmap.mmap)):
+            # slices of other buffers, e.g. bytearray, cannot be hashed like bytes
+            string = bytes(string)
+    if stats is None:
+        return scanner_class(string, max_depth, parse_float, parse_int, keys, key_cache_size,
+                             numeric_arrays, duplicate_keys)
+    # only instrumented parsing pays for the instrumentation
+    scanner = _instrumented(scanner_class)(string, max_depth, parse_float, parse_int, keys, key_cache_size,
+                                           numeric_arrays, duplicate_keys)
+    scanner._stats = stats
+    return scanner
+
+
+def _compile_selector(selector: str) -> SelectorSteps:
+    """
+    split a selector such as "statuses[*].user.id" into steps
+    :param selector:
+    :return:
+    """
+    steps: list[Union[str, int, None]] = []
+    current_index = 1 if selector.startswith('$') else 0
+    while current_index < len(selector):
+        match = SELECTOR_STEP_RE.match(selector, current_index)
+        if match is None:
+            raise ValueError(f"invalid selector {selector!r}")
+        key, index = match.groups()
+        if key is not None:
+            steps.append(None if key == '*' else key)
+        else:
+            steps.append(None if index == '*' else int(index))
+        current_index = match.end()
+    return tuple(steps)
+
+
+def _select_from(value: JsonBasicType, steps: SelectorSteps,
+                 matches: list[JsonBasicType]) -> None:
+    """
+    collect the values matched by the remaining steps of a selector in a built value
+    :param value:
+    :param steps:
+    :param matches:
+    :return:
+    """
+    if not steps:
+        matches.append(value)
+        return
+    step, rest = steps[0], steps[1:]
+    if isinstance(value, dict):
+        if step is None:
+            for child in value.values():
+                _select_from(child, rest, matches)
+        elif isinstance(step, str) and step in value:
+            _select_from(value[step], rest, matches)
+    elif isinstance(value, ObjectPairs):
+        # an object with repeated keys, whose members a key step all matches
+        if step is None:
+            for _, child in value:
+                _select_from(child, rest, matches)
+        elif isinstance(step, str):
+            for child in value.getall(step):
+                _select_from(child, rest, matches)
+    elif isinstance(value, list):
+        if step is None:
+            for child in value:
+                _select_from(child, rest, matches)
+        elif isinstance(step, int) and step < len(value):
+            _select_from(value[step], rest, matches)
+
+
+async def _iter_stream_reader(reader: asyncio.StreamReader, chunk_size: int) -> AsyncIterator[bytes]:
+    while chunk := await reader.read(chunk_size):
+        yield chunk
+
+
+def _iter_lines(file: Union[BinaryIO, TextIO], chunk_size: int) \
+        -> Iterator[tuple[int, Optional[int], Union[str, bytes]]]:
+    """
+    split a file into lines, reading at most chunk_size at a time
+    :param file:
+    :param chunk_size:
+    :return: iterator over tuples of line number, byte offset of the line and the line
+        itself; the offset is None in text mode, whose characters and newlines do not
+        tell how many bytes the file holds
+    """
+    lineno = 1
+    offset: Optional[int] = 0
+    parts: list[Union[str, bytes]] = []
+    while chunk := file.read(chunk_size):
+        newline = '\n' if isinstance(chunk, str) else b'\n'
+        if isinstance(chunk, str):
+            offset = None
+        start = 0
+        while (end := chunk.find(newline, start)) != -1:
+            parts.append(chunk[start:end])
+            line = chunk[:0].join(parts)
+            parts.clear()
+            yield lineno, offset, line
+            lineno += 1
+            if offset is not None:
+                offset += len(line) + 1
+            start = end + 1
+        if start < len(chunk):
+            parts.append(chunk[start:])
+    if parts:
+        yield lineno, offset, parts[0][:0].join(parts)
 
 
-def stringify(obj: Any) -> str:
+def _parse_shard(path: Union[str, os.PathLike], start: int, end: int,
+                 options: tuple) -> list[JsonBasicType]:
+    """
+    parse the lines of a newline-delimited json file which start in [start, end)
+    :param path:
+    :param start:
+    :param end:
+    :param options: max_depth, parse_float, parse_int and skip_errors
+    :return:
+    """
+    max_depth, parse_float, parse_int, skip_errors = options
+    decoder = Decoder(max_depth, parse_float, parse_int)
+    with open(path, 'rb') as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+        if start > 0:
+            # the line running into the shard belongs to the previous one
+            newline = memory.find(b'\n', start - 1)
+            if newline == -1:
+                return []
+            start = newline + 1
+        try:
+            return list(decoder._parse_lines(_iter_shard_lines(memory, start, end), skip_errors))
+        except LeptJsonParseError as error:
+            # line numbers are counted from the start of the shard
+            lineno = error.lineno + memory[:start].count(b'\n')
+            raise error._in_record(lineno, error.byte_offset) from None
+
+
+def _parse_segment(text: Union[str, bytes], options: tuple) -> list[JsonBasicType]:
+    """
+    parse a range of the elements of an array, put between brackets
+    :param text:
+    :param options: max_depth, parse_float and parse_int
+    :return:
+    """
+    return Decoder(*options).parse(text)
+
+
+def _iter_shard_lines(memory: mmap.mmap, start: int, end: int) -> Iterator[tuple[int, int, bytes]]:
+    """
+    :param memory:
+    :param start: offset of the first line
+    :param end:
+    :return: iterator over tuples of line number counted from start, offset of the
+        line and the line itself, for every line starting before end
+    """
+    lineno = 1
+    while start < end:
+        newline = memory.find(b'\n', start)
+        if newline == -1:
+            newline = len(memory)
+        yield lineno, start, memory[start:newline]
+        lineno += 1
+        start = newline + 1
+
+
+def _parse_batch(lines: list[Union[str, bytes]], lineno: int, options: tuple) -> list[JsonBasicType]:
+    """
+    parse consecutive lines of newline-delimited json
+    :param lines:
+    :param lineno: line number of the first line
+    :param options: max_depth, parse_float, parse_int and skip_errors
+    :return:
+    """
+    max_depth, parse_float, parse_int, skip_errors = options
+    decoder = Decoder(max_depth, parse_float, parse_int)
+    numbered_lines = ((lineno + index, None, line) for index, line in enumerate(lines))
+    return list(decoder._parse_lines(numbered_lines, skip_errors))
+
+
+def _batch_lines(lines: Iterable[Union[str, bytes]], batch_size: int) \
+        -> Iterator[tuple[int, list[Union[str, bytes]]]]:
+    """
+    group lines into batches of about batch_size characters or bytes
+    :param lines:
+    :param batch_size:
+    :return: iterator over tuples of the line number of the first line and the batch
+    """
+    lineno = 1
+    batch: list[Union[str, bytes]] = []
+    size = 0
+    for line in lines:
+        batch.append(line)
+        size += len(line)
+        if size >= batch_size:
+            yield lineno, batch
+            lineno += len(batch)
+            batch = []
+            size = 0
+    if batch:
+        yield lineno, batch
+
+
+class IncrementalDecoder:
+    """
+    Push parser for json text that arrives in chunks, e.g. from a socket.
+
+    The grammar advances as the chunks arrive: every token a chunk completes is
+    parsed into the arrays and objects in progress, which are kept on an explicit
+    stack between chunks. A chunk may stop anywhere, inside a string, an escape
+    sequence or a number; only the token it cuts is kept, and scanned again once
+    the chunk that finishes it has been fed. As soon as the closing token of a
+    value has been fed, the value is returned. Errors are located from the start
+    of the input.
+
+    >>> decoder = IncrementalDecoder()
+    >>> decoder.feed('{"a": [1, 2')
+    []
+    >>> decoder.feed(']}')
+    [{'a': [1.0, 2.0]}]
+    >>> decoder.close()
+    []
+    """
+
+    def __init__(self, multiple: bool = False, max_depth: int = DEFAULT_MAX_DEPTH,
+                 parse_float: Optional[Callable[[str], Any]] = None,
+                 parse_int: Optional[Callable[[str], Any]] = None):
+        """
+        :param multiple: accept a stream of concatenated or newline-delimited json values,
+            instead of exactly one value
+        :param max_depth: maximum number of nested arrays and objects
+        :param parse_float: see parse
+        :param parse_int: see parse
+        """
+        self._multiple = multiple
+        self._max_depth = max_depth
+        self._parse_float = parse_float
+        self._parse_int = parse_int
+        # object keys shared by the values of a stream
+        self._keys: dict[Any, str] = {}
+        self._utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+        # objects and arrays being parsed, innermost last
+        self._stack: list[Union[dict[str, JsonBasicType], list[JsonBasicType]]] = []
+        # key of the member being parsed in each object, None for arrays
+        self._member_keys: list[Optional[str]] = []
+        # what comes next: 'value', 'first value' (or the end of an array),
+        # 'key', 'first key' (or the end of an object), 'separator', or 'end' of the input
+        self._expect = 'value'
+        # pieces of the token cut by the end of the text fed so far
+        self._parts: list[str] = []
+        # kind of that token: 'string', 'key' or 'scalar', empty if there is none
+        self._tail = ''
+        # whether that token ends inside a string, and right after a backslash in it
+        self._in_string = False
+        self._in_escape = False
+        # characters and lines before the pieces, and the column of the first piece
+        self._position = 0
+        self._lineno = 1
+        self._colno = 1
+        self._values_count = 0
+
+    def feed(self, chunk: Union[str, bytes]) -> list[JsonBasicType]:
+        """
+        :param chunk: next piece of json text, bytes are decoded as utf-8
+        :return: values completed by this chunk
+        """
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            try:
+                chunk = self._utf8_decoder.decode(chunk)
+            except UnicodeDecodeError:
+                raise LeptJsonParseError("lept parse invalid utf-8")
+        return self._consume(chunk, False)
+
+    def close(self) -> list[JsonBasicType]:
+        """
+        signal the end of input
+        :return: value completed by the end of input, if any
+        """
+        try:
+            text = self._utf8_decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            raise LeptJsonParseError("lept parse invalid utf-8")
+        values = self._consume(text, True)
+        if self._values_count == 0 and not self._multiple:
+            raise LeptJsonParseError("lept parse expect value")
+        return values
+
+    def _consume(self, text: str, final: bool) -> list[JsonBasicType]:
+        """
+        :param text:
+        :param final: whether text ends the input
+        :return: values completed by text
+        """
+        if self._tail:
+            self._parts.append(text)
+            if not final and not self._finishes_tail(text):
+                return []
+            text = ''.join(self._parts)
+            self._parts.clear()
+            self._tail = ''
+        try:
+            values, current_index = self._advance(
+                _Scanner(text, self._max_depth, self._parse_float, self._parse_int, self._keys), final)
+        except LeptJsonParseError as error:
+            raise error._after(self._position, self._lineno, self._colno) from None
+        if self._tail:
+            self._parts.append(text[current_index:])
+        newlines = text.count('\n', 0, current_index)
+        if newlines:
+            self._lineno += newlines
+            self._colno = current_index - text.rfind('\n', 0, current_index)
+        else:
+            self._colno += current_index
+        self._position += current_index
+        return values
+
+    def _advance(self, scanner: '_Scanner', final: bool) -> tuple[list[JsonBasicType], int]:
+        """
+        parse the tokens of the text that are complete, like _Scanner._parse_value
+        but resuming from and returning to the state kept between chunks
+        :param scanner: over the text, starting with the token cut by the last chunk
+        :param final: whether the text ends the input
+        :return: tuple of the values completed and the position of the token cut by
+            the end of the text, or the length of the text
+        """
+        string = scanner._string
+        length = len(string)
+        whitespace = scanner.WHITESPACE_RE.match
+        hooks = self._parse_float is not None or self._parse_int is not None
+        stack = self._stack
+        keys = self._member_keys
+        expect = self._expect
+        values: list[JsonBasicType] = []
+        current_index = 0
+        while True:
+            current_index = whitespace(string, current_index).end()
+            if current_index == length and not final:
+                break
+            element = string[current_index:current_index + 1]
+            if expect == 'separator':
+                if type(stack[-1]) is dict:
+                    if element == scanner.VALUE_SEPARATOR:
+                        expect = 'key'
+                        current_index = whitespace(string, current_index + 1).end()
+                        if current_index == length and not final:
+                            break
+                    elif element != scanner.END_OBJECT:
+                        raise scanner._error("lept parse miss comma or curly bracket", current_index)
+                elif element == scanner.VALUE_SEPARATOR:
+                    expect = 'value'
+                    current_index += 1
+                    continue
+                elif element != scanner.END_ARRAY:
+                    raise scanner._error("lept parse miss comma or square bracket", current_index)
+            if expect == 'key' or (expect == 'first key' and element != scanner.END_OBJECT):
+                try:
+                    keys[-1], current_index = scanner._parse_key(current_index)
+                except LeptJsonParseError:
+                    if final or not self._cuts_key(string, current_index):
+                        raise
+                    self._tail = 'key'
+                    break
+                expect = 'value'
+                continue
+            if expect == 'separator' or expect == 'first key' or \
+                    (expect == 'first value' and element == scanner.END_ARRAY):
+                value = stack.pop()
+                keys.pop()
+                current_index += 1
+            elif expect == 'end':
+                if element:
+                    raise scanner._error("lept parse root not singular", current_index)
+                break
+            elif element == scanner.QUOTE:
+                try:
+                    value, current_index = scanner._parse_string(current_index)
+                except LeptJsonParseError:
+                    if final or not self._cuts_string(string, current_index):
+                        raise
+                    self._tail = 'string'
+                    break
+            elif element == scanner.BEGIN_OBJECT or element == scanner.BEGIN_ARRAY:
+                if len(stack) == self._max_depth:
+                    raise scanner._error("lept parse max depth exceeded", current_index)
+                if element == scanner.BEGIN_OBJECT:
+                    stack.append({})
+                    keys.append('')
+                    expect = 'first key'
+                else:
+                    stack.append([])
+                    keys.append(None)
+                    expect = 'first value'
+                current_index += 1
+                continue
+            elif not element:
+                if not stack:
+                    break
+                if type(stack[-1]) is list:
+                    raise scanner._error("lept parse miss comma or square bracket", current_index)
+                raise scanner._error("lept parse expect value", current_index)
+            elif hooks and element not in scanner.LITERALS and not final and \
+                    SCALAR_RE.match(string, current_index).end() == length:
+                # parse_float and parse_int are only given whole numbers
+                self._tail = 'scalar'
+                break
+            else:
+                try:
+                    if element in scanner.LITERALS:
+                        value, scalar_end = \
+                            scanner._parse_literal(current_index, *scanner.LITERALS[element])
+                    else:
+                        value, scalar_end = scanner._parse_number(current_index)
+                except LeptJsonParseError:
+                    if final or SCALAR_RE.match(string, current_index).end() < length:
+                        raise
+                    scalar_end = length
+                if scalar_end == length and not final:
+                    # the number or literal may go on in the next chunk
+                    self._tail = 'scalar'
+                    break
+                current_index = scalar_end
+            if stack:
+                container = stack[-1]
+                if type(container) is dict:
+                    container[keys[-1]] = value
+                else:
+                    container.append(value)
+                expect = 'separator'
+            else:
+                values.append(value)
+                self._values_count += 1
+                expect = 'value' if self._multiple else 'end'
+        self._expect = expect
+        return values, current_index
+
+    def _cuts_key(self, text: str, current_index: int) -> bool:
+        """
+        :param text:
+        :param current_index: position of an object member name which failed to parse
+        :return: whether the end of text cuts the name or the whitespace before its colon
+        """
+        if text[current_index:current_index + 1] != '"':
+            return False
+        if self._cuts_string(text, current_index):
+            return True
+        return WHITESPACE_RE.match(text, self._skim_string(text, current_index + 1)).end() == len(text)
+
+    def _cuts_string(self, text: str, current_index: int) -> bool:
+        """
+        :param text:
+        :param current_index: position of a string which failed to parse
+        :return: whether the end of text comes before the closing quote of the string
+        """
+        self._in_string = True
+        self._in_escape = False
+        return self._skim_string(text, current_index + 1) == -1
+
+    def _finishes_tail(self, chunk: str) -> bool:
+        """
+        :param chunk:
+        :return: whether chunk finishes the token cut by the end of the text fed before it
+        """
+        current_index = 0
+        if self._in_string:
+            current_index = self._skim_string(chunk, 0)
+            if current_index == -1:
+                return False
+            if self._tail == 'string':
+                return True
+        pattern = SCALAR_RE if self._tail == 'scalar' else WHITESPACE_RE
+        return pattern.match(chunk, current_index).end() < len(chunk)
+
+    def _skim_string(self, text: str, current_index: int) -> int:
+        """
+        skip to the end of the string in progress, without decoding it
+        :param text:
+        :param current_index: position inside the string
+        :return: the position after the closing quote, or -1 if text ends before it
+        """
+        length = len(text)
+        if self._in_escape:
+            if current_index == length:
+                return -1
+            self._in_escape = False
+            current_index += 1
+        while True:
+            match = STRING_SPECIAL_RE.search(text, current_index)
+            if match is None:
+                return -1
+            current_index = match.end()
+            if match.group() == '"':
+                self._in_string = False
+                return current_index
+            if current_index == length:
+                self._in_escape = True
+                return -1
+            current_index += 1
+
+
+def stringify(obj: Any, max_depth: int = DEFAULT_MAX_DEPTH, ensure_ascii: bool = False,
+              default: Optional[Callable[[Any], Any]] = None) -> str:
     """
     serialize a python object into json string
     :param obj:
+    :param max_depth: maximum number of nested lists, tuples and dicts
+    :param ensure_ascii: escape every non-ascii character as \\uXXXX
+    :param default: converts a value of any other type into one that can be serialized
     :return:
     """
-    if obj is None:
-        return "null"
-    if obj is False:
-        return "false"
-    if obj is True:
-        return "true"
-    if isinstance(obj, (int, float)):
-        return '{0:.17g}'.format(obj)
-    if isinstance(obj, str):
-        return _stringify_str(obj)
-    if isinstance(obj, (list, tuple)):
-        return _stringify_sequence(obj)
-    if isinstance(obj, dict):
-        return _stringify_dict(obj)
-    # Can only stringify limited number of class
-    raise LeptJsonStringifyError(f"Cannot stringify instance of {type(obj)}")
-
-
-def _stringify_sequence(sequence: Union[list[Any], tuple[Any, ...]]) -> str:
-    if len(sequence) == 0:
-        return '[]'
-    buffer = ['[']
-    for element in sequence:
-        buffer.append(stringify(element))
-        buffer.append(',')
-    # According to the json standard,
-    # there shall not be ',' after the last element,
-    # and we change it to ']'
-    buffer[-1] = ']'
+    buffer: list[str] = []
+    for _ in _stringify_value(obj, buffer, max_depth, ensure_ascii, default, sys.maxsize):
+        pass
     return ''.join(buffer)
 
 
-def _stringify_dict(obj: dict[Any, Any]) -> str:
-    if len(obj) == 0:
-        return '{}'
-    buffer = ['{']
-    for key, value in obj.items():
-        buffer.append(stringify(key))
-        buffer.append(':')
-        buffer.append(stringify(value))
-        buffer.append(',')
-    # According to the json standard,
-    # there shall not be ',' after the last element,
-    # and we change it to '}'
-    buffer[-1] = '}'
-    return ''.join(buffer)
+def iter_stringify(obj: Any, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   max_depth: int = DEFAULT_MAX_DEPTH, ensure_ascii: bool = False,
+                   default: Optional[Callable[[Any], Any]] = None) -> Iterator[str]:
+    """
+    serialize a python object into json text piece by piece,
+    so that the whole text is never held in memory at once
+    :param obj:
+    :param chunk_size: every chunk but the last has at least this many characters
+    :param max_depth: maximum number of nested lists, tuples and dicts
+    :param ensure_ascii: escape every non-ascii character as \\uXXXX
+    :param default: converts a value of any other type into one that can be serialized
+    :return: iterator of chunks which joined together equal stringify(obj)
+    """
+    buffer: list[str] = []
+    chunks: list[str] = []
+    size = 0
+    for _ in _stringify_value(obj, buffer, max_depth, ensure_ascii, default,
+                              STRINGIFY_FLUSH_PIECES):
+        chunk = ''.join(buffer)
+        buffer.clear()
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= chunk_size:
+            yield ''.join(chunks)
+            chunks.clear()
+            size = 0
+    chunks.append(''.join(buffer))
+    yield ''.join(chunks)
+
+
+def dump(obj: Any, fp: Union[TextIO, BinaryIO], chunk_size: int = DEFAULT_CHUNK_SIZE,
+         max_depth: int = DEFAULT_MAX_DEPTH, ensure_ascii: bool = False,
+         default: Optional[Callable[[Any], Any]] = None) -> None:
+    """
+    serialize a python object as json text into a file object, chunk by chunk
+    :param obj:
+    :param fp: text file, or binary file which receives utf-8
+    :param chunk_size: number of characters written at a time
+    :param max_depth: maximum number of nested lists, tuples and dicts
+    :param ensure_ascii: escape every non-ascii character as \\uXXXX
+    :param default: converts a value of any other type into one that can be serialized
+    :return:
+    """
+    binary = isinstance(fp, (io.RawIOBase, io.BufferedIOBase))
+    for chunk in iter_stringify(obj, chunk_size, max_depth, ensure_ascii, default):
+        fp.write(chunk.encode('utf-8') if binary else chunk)
+
+
+def _stringify_value(obj: Any, buffer: list[str], max_depth: int, ensure_ascii: bool,
+                     default: Optional[Callable[[Any], Any]], flush_pieces: int) -> Iterator[None]:
+    """
+    append the json text of obj to buffer; lists, tuples and dicts being serialized
+    are kept on an explicit stack instead of recursing into them
+    :param obj:
+    :param buffer:
+    :param max_depth:
+    :param ensure_ascii:
+    :param default:
+    :param flush_pieces: yield whenever buffer holds at least this many pieces,
+                         the caller may then take them out of buffer
+    :return:
+    """
+    dispatch = _STRINGIFY_DISPATCH
+    # iterators over the remaining members of the containers being serialized,
+    # and whether each container is a dict, innermost last
+    stack: list[tuple[Iterator[Any], bool]] = []
+    while True:
+        kind, function = dispatch.get(type(obj)) or _dispatch_type(type(obj))
+        if kind == _CONVERT:
+            obj = _convert(obj, function, default)
+            continue
+        if kind != _SCALAR and len(stack) == max_depth:
+            raise LeptJsonStringifyError(f"Cannot stringify objects nested deeper than {max_depth}")
+        if kind != _SCALAR and kind != _NUMBERS and obj:
+            is_dict = kind == _OBJECT
+            buffer.append('{' if is_dict else '[')
+            stack.append((iter(obj.items()) if is_dict else iter(obj), is_dict))
+        else:
+            # including empty lists, tuples and dicts
+            buffer.append(function(obj, ensure_ascii))
+            if not stack:
+                return
+            buffer.append(',')
+        # find the next member, closing the containers that have no members left
+        while (member := next(stack[-1][0], _NO_MEMBER)) is _NO_MEMBER:
+            # According to the json standard,
+            # there shall not be ',' after the last element,
+            # and we change it to '}' or ']'
+            buffer[-1] = '}' if stack.pop()[1] else ']'
+            if not stack:
+                return
+            buffer.append(',')
+        if stack[-1][1]:
+            key, obj = member
+            if type(key) is str:
+                buffer.append(_stringify_str(key, ensure_ascii))
+            else:
+                buffer.append(stringify(key, max_depth, ensure_ascii, default))
+            buffer.append(':')
+        else:
+            obj = member
+        # every piece in buffer is final here, the ',' rewritten above
+        # is always appended within the same round
+        if len(buffer) >= flush_pieces:
+            yield
+
+
+def register_encoder(cls: type, function: Callable[[Any], Any]) -> None:
+    """
+    make stringify serialize instances of cls, and of its subclasses,
+    as the json text of function(instance)
+    :param cls:
+    :param function: converts an instance into a value stringify can serialize
+    :return:
+    """
+    _ENCODERS[cls] = function
+    # the types resolved so far may now resolve to function
+    _STRINGIFY_DISPATCH.clear()
+
+
+def _dispatch_type(cls: type) -> tuple[int, Optional[Callable]]:
+    """
+    find how stringify serializes instances of cls, and cache it
+    :param cls:
+    :return: kind of json value and the function which serializes a scalar or converts a custom value,
+             a custom value without function is left to the default hook
+    """
+    for base in cls.__mro__:
+        if base in _ENCODERS:
+            entry = (_CONVERT, _ENCODERS[base])
+            break
+        if base in _BUILTIN_DISPATCH:
+            entry = _BUILTIN_DISPATCH[base]
+            break
+    else:
+        if dataclasses.is_dataclass(cls):
+            attributes = [(field.name, field.name) for field in dataclasses.fields(cls)]
+            entry = (_CONVERT, partial(_attributes_to_dict, attributes))
+        elif any('__slots__' in vars(base) for base in cls.__mro__):
+            entry = (_CONVERT, partial(_attributes_to_dict, _slot_attributes(cls)))
+        else:
+            entry = (_CONVERT, None)
+    _STRINGIFY_DISPATCH[cls] = entry
+    return entry
+
+
+def _convert(obj: Any, function: Optional[Callable[[Any], Any]],
+             default: Optional[Callable[[Any], Any]]) -> Any:
+    """
+    convert a custom value until it is one stringify can serialize
+    :param obj:
+    :param function: the registered encoder or attribute conversion of obj, if any
+    :param default:
+    :return:
+    """
+    for _ in range(MAX_CONVERSIONS):
+        function = function or default
+        if function is None:
+            # Can only stringify limited number of class
+            raise LeptJsonStringifyError(f"Cannot stringify instance of {type(obj)}")
+        converted = function(obj)
+        if converted is obj:
+            raise LeptJsonStringifyError(f"Cannot stringify instance of {type(obj)}")
+        obj = converted
+        kind, function = _STRINGIFY_DISPATCH.get(type(obj)) or _dispatch_type(type(obj))
+        if kind != _CONVERT:
+            return obj
+    raise LeptJsonStringifyError(f"Cannot stringify instance of {type(obj)}, "
+                                 f"converted more than {MAX_CONVERSIONS} times")
+
+
+def _slot_attributes(cls: type) -> list[tuple[str, str]]:
+    """
+    :param cls:
+    :return: name and attribute name of every slot of cls, base classes first
+    """
+    attributes = []
+    for base in reversed(cls.__mro__):
+        slots = vars(base).get('__slots__', ())
+        for name in ((slots,) if isinstance(slots, str) else slots):
+            if name in ('__dict__', '__weakref__'):
+                continue
+            attribute = name
+            if name.startswith('__') and not name.endswith('__'):
+                # private names are mangled
+                attribute = f"_{base.__name__.lstrip('_')}{name}"
+            attributes.append((name, attribute))
+    return attributes
+
+
+def _attributes_to_dict(attributes: list[tuple[str, str]], obj: Any) -> dict[str, Any]:
+    members = {}
+    for name, attribute in attributes:
+        value = getattr(obj, attribute, _NO_MEMBER)
+        # unassigned slots are left out
+        if value is not _NO_MEMBER:
+            members[name] = value
+    # instances of slotted subclasses of classes without __slots__ have a __dict__ too
+    members.update(getattr(obj, '__dict__', ()))
+    return members
+
+
+def _stringify_null(obj: None, ensure_ascii: bool = False) -> str:
+    return "null"
+
+
+def _stringify_bool(obj: bool, ensure_ascii: bool = False) -> str:
+    return "true" if obj else "false"
+
+
+def _stringify_int(obj: int, ensure_ascii: bool = False) -> str:
+    # exact, unlike the float format below for integers of more than 17 digits
+    return int.__repr__(obj)
+
+
+def _stringify_float(obj: float, ensure_ascii: bool = False) -> str:
+    return '{0:.17g}'.format(obj)
+
+
+def _stringify_empty_array(obj: Union[list, tuple], ensure_ascii: bool = False) -> str:
+    return '[]'
+
+
+def _stringify_empty_object(obj: dict, ensure_ascii: bool = False) -> str:
+    return '{}'
+
+
+def _stringify_numbers(obj: array.array, ensure_ascii: bool = False) -> str:
+    if obj.typecode in ('f', 'd'):
+        return '[' + ','.join(map('{0:.17g}'.format, obj)) + ']'
+    if obj.typecode in ('u', 'w'):
+        raise LeptJsonStringifyError(f"Cannot stringify array of typecode {obj.typecode!r}")
+    return '[' + ','.join(map(int.__repr__, obj)) + ']'
 
 
 # definition of json string
@@ -138,265 +2000,1506 @@ def _stringify_dict(obj: dict[Any, Any]) -> str:
 #
 #      unescaped = %x20-21 / %x23-5B / %x5D-10FFFF
 
-def _stringify_str(obj: str) -> str:
-    buffer = ['"']
-    for char in obj:
-        char_ord = ord(char)
-        if char_ord == 0x22:
-            buffer.append('\\"')
-        elif char_ord == 0x5c:
-            buffer.append('\\\\')
-        elif char_ord == 0x08:
-            buffer.append('\\b')
-        elif char_ord == 0x0c:
-            buffer.append('\\f')
-        elif char_ord == 0x0a:
-            buffer.append('\\n')
-        elif char_ord == 0x0d:
-            buffer.append('\\r')
-        elif char_ord == 0x09:
-            buffer.append('\\t')
-        # these unicode can be directly put into json string
-        elif (0x20 <= char_ord <= 0x21) or (0x23 <= char_ord <= 0x5b) or (
-                0x5d <= char_ord <= 0x10ffff):
-            buffer.append(char)
-        # No control characters allowed in json string, must be escaped.
-        elif char_ord < 0x20:
-            buffer.append('\\u{0:04x}'.format(char_ord))
-    buffer.append('"')
-    return ''.join(buffer)
+def _stringify_str(obj: str, ensure_ascii: bool = False) -> str:
+    escape_re = ESCAPE_ASCII_RE if ensure_ascii else ESCAPE_RE
+    # most strings have nothing to escape
+    if escape_re.search(obj) is None:
+        return '"' + obj + '"'
+    return '"' + escape_re.sub(_escape_character, obj) + '"'
 
 
-def _parse_whitespace(json_string: _String, current_index: int) -> int:
+def _escape_character(match: re.Match) -> str:
+    char = match.group()
+    escaped = STRINGIFY_ESCAPES.get(char)
+    if escaped is not None:
+        return escaped
+    char_ord = ord(char)
+    if char_ord > 0xffff:
+        # characters outside the basic multilingual plane are written as a surrogate pair
+        char_ord -= 0x10000
+        return '\\u{0:04x}\\u{1:04x}'.format(0xd800 | (char_ord >> 10), 0xdc00 | (char_ord & 0x3ff))
+    return '\\u{0:04x}'.format(char_ord)
+
+
+# kinds of json values in the dispatch tables below
+# _NUMBERS are arrays serialized in one piece, nested like _ARRAY
+_SCALAR, _ARRAY, _OBJECT, _CONVERT, _NUMBERS = range(5)
+_BUILTIN_DISPATCH: dict[type, tuple[int, Callable[[Any, bool], str]]] = {
+    type(None): (_SCALAR, _stringify_null),
+    bool: (_SCALAR, _stringify_bool),
+    int: (_SCALAR, _stringify_int),
+    float: (_SCALAR, _stringify_float),
+    str: (_SCALAR, _stringify_str),
+    list: (_ARRAY, _stringify_empty_array),
+    tuple: (_ARRAY, _stringify_empty_array),
+    dict: (_OBJECT, _stringify_empty_object),
+    ObjectPairs: (_OBJECT, _stringify_empty_object),
+    array.array: (_NUMBERS, _stringify_numbers),
+}
+# functions registered by register_encoder
+_ENCODERS: dict[type, Callable[[Any], Any]] = {}
+# how to serialize every type seen so far, see _dispatch_type
+_STRINGIFY_DISPATCH: dict[type, tuple[int, Optional[Callable]]] = {}
+
+
+def dumpb(obj: JsonBasicType, key_dictionary: bool = True,
+          max_depth: int = DEFAULT_MAX_DEPTH) -> bytes:
     """
-    :param json_string:
-    :param current_index:
-    :return: the position after whitespace
+    serialize a python object into the compact binary format read by loadb
+    :param obj: made of dicts with str keys, lists, tuples, numeric array.array, str, int, float,
+        bool and None
+    :param key_dictionary: store every distinct object key once, and refer to it by index
+    :param max_depth: maximum number of nested lists, tuples and dicts
+    :return:
     """
-    while json_string[current_index] in JSON_SPACE_CHARACTERS_SET:
-        current_index += 1
-    return current_index
+    body = bytearray()
+    keys: Optional[dict[str, int]] = {} if key_dictionary else None
+    # iterators over the remaining members of the containers being serialized,
+    # and whether each container is a dict, innermost last
+    stack: list[tuple[Iterator[Any], bool]] = []
+    while True:
+        if isinstance(obj, (dict, list, tuple, array.array)):
+            if len(stack) == max_depth:
+                raise LeptJsonStringifyError(f"Cannot dumpb objects nested deeper than {max_depth}")
+            is_dict = isinstance(obj, (dict, ObjectPairs))
+            body.append(BINARY_OBJECT if is_dict else BINARY_ARRAY)
+            _write_varint(body, len(obj))
+            stack.append((iter(obj.items()) if is_dict else iter(obj), is_dict))
+        else:
+            _dumpb_scalar(obj, body)
+        # find the next member, closing the containers that have no members left
+        while stack and (member := next(stack[-1][0], _NO_MEMBER)) is _NO_MEMBER:
+            stack.pop()
+        if not stack:
+            break
+        if stack[-1][1]:
+            key, obj = member
+            if not isinstance(key, str):
+                raise LeptJsonStringifyError(f"Cannot dumpb key of type {type(key)}")
+            if keys is None:
+                _write_str(body, key)
+            else:
+                index = keys.get(key)
+                if index is None:
+                    index = keys[key] = len(keys)
+                _write_varint(body, index)
+        else:
+            obj = member
+    header = bytearray(BINARY_MAGIC)
+    if keys is None:
+        header.append(0)
+    else:
+        header.append(BINARY_KEY_DICTIONARY)
+        _write_varint(header, len(keys))
+        for key in keys:
+            _write_str(header, key)
+    return bytes(header + body)
 
 
-def _parse_value(json_string: _String, current_index: int) -> tuple[JsonBasicType, int]:
+def loadb(buffer: Union[bytes, bytearray, memoryview]) -> JsonBasicType:
     """
+    deserialize the binary format written by dumpb
+    :param buffer:
+    :return: the python object, equal to parse(stringify(obj)) for the obj given to dumpb
+    """
+    data = bytes(buffer)
+    if data[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise LeptJsonParseError("lept loadb invalid header")
+    try:
+        value, current_index = _loadb_value(data)
+    except (IndexError, struct.error, UnicodeDecodeError):
+        raise LeptJsonParseError("lept loadb invalid data") from None
+    if current_index != len(data):
+        raise LeptJsonParseError("lept loadb invalid data")
+    return value
+
 
-    :param json_string:
+def _loadb_value(data: bytes) -> tuple[JsonBasicType, int]:
+    """
+    :param data:
+    :return: tuple of the value and the position after it
+    """
+    current_index = len(BINARY_MAGIC) + 1
+    keys: Optional[list[str]] = None
+    if data[current_index - 1] & BINARY_KEY_DICTIONARY:
+        count, current_index = _read_varint(data, current_index)
+        keys = []
+        for _ in range(count):
+            length, current_index = _read_varint(data, current_index)
+            keys.append(data[current_index:current_index + length].decode('utf-8', 'surrogatepass'))
+            current_index += length
+    unpack_float = BINARY_FLOAT_STRUCT.unpack_from
+    # containers being built, number of members each still misses, and the key of
+    # the member being read in each object or None for arrays, innermost last
+    stack: list[Union[dict[str, JsonBasicType], list[JsonBasicType]]] = []
+    remaining: list[int] = []
+    member_keys: list[Optional[str]] = []
+    while True:
+        tag = data[current_index]
+        current_index += 1
+        if tag == BINARY_STRING:
+            length = data[current_index]
+            current_index += 1
+            if length >= 0x80:
+                length, current_index = _read_varint(data, current_index - 1)
+            value = data[current_index:current_index + length].decode('utf-8', 'surrogatepass')
+            current_index += length
+        elif tag == BINARY_INTEGRAL_FLOAT or tag == BINARY_INT:
+            value, current_index = _read_varint(data, current_index)
+            # zigzag encoding of signed integers
+            value = -(value >> 1) - 1 if value & 1 else value >> 1
+            if tag == BINARY_INTEGRAL_FLOAT:
+                value = float(value)
+        elif tag == BINARY_FLOAT:
+            value = unpack_float(data, current_index)[0]
+            current_index += 8
+        elif tag == BINARY_NULL:
+            value = None
+        elif tag == BINARY_TRUE:
+            value = True
+        elif tag == BINARY_FALSE:
+            value = False
+        elif tag == BINARY_ARRAY or tag == BINARY_OBJECT:
+            count, current_index = _read_varint(data, current_index)
+            if count:
+                if tag == BINARY_ARRAY:
+                    stack.append([])
+                    member_keys.append(None)
+                else:
+                    stack.append({})
+                    key, current_index = _read_key(data, current_index, keys)
+                    member_keys.append(key)
+                remaining.append(count)
+                continue
+            value = [] if tag == BINARY_ARRAY else {}
+        else:
+            raise LeptJsonParseError("lept loadb invalid data")
+        # add the value to the innermost container, closing the containers that end here
+        while stack:
+            key = member_keys[-1]
+            if key is None:
+                stack[-1].append(value)
+            else:
+                stack[-1][key] = value
+            remaining[-1] -= 1
+            if remaining[-1]:
+                if key is not None:
+                    member_keys[-1], current_index = _read_key(data, current_index, keys)
+                break
+            value = stack.pop()
+            remaining.pop()
+            member_keys.pop()
+        else:
+            return value, current_index
+
+
+def _read_key(data: bytes, current_index: int, keys: Optional[list[str]]) -> tuple[str, int]:
+    if keys is not None:
+        index, current_index = _read_varint(data, current_index)
+        return keys[index], current_index
+    length, current_index = _read_varint(data, current_index)
+    return data[current_index:current_index + length].decode('utf-8', 'surrogatepass'), \
+        current_index + length
+
+
+def _read_varint(data: bytes, current_index: int) -> tuple[int, int]:
+    """
+    read an unsigned integer stored 7 bits a byte, least significant first,
+    with the high bit set on every byte but the last
+    :param data:
     :param current_index:
-    :return: tuple of a json value and the position after the json value
-    """
-    element = json_string[current_index]
-    if element == '':
-        raise LeptJsonParseError("lept parse expect value")
-    if element == 'n':
-        return _parse_literal(json_string, current_index, "null", None)
-    if element == 't':
-        return _parse_literal(json_string, current_index, "true", True)
-    if element == 'f':
-        return _parse_literal(json_string, current_index, "false", False)
-    if element == '"':
-        return _parse_string(json_string, current_index)
-    if element == '[':
-        return _parse_array(json_string, current_index)
-    if element == '{':
-        return _parse_object(json_string, current_index)
-    return _parse_number(json_string, current_index)
-
-
-def _parse_object(json_string: _String, current_index: int) \
-        -> tuple[dict[str, JsonBasicType], int]:
-    result: dict[str, JsonBasicType] = {}
+    :return: tuple of the integer and the position after it
+    """
+    byte = data[current_index]
     current_index += 1
-    current_index = _parse_whitespace(json_string, current_index)
-    if json_string[current_index] == '':
-        raise LeptJsonParseError("lept parse miss key")
-    if json_string[current_index] == '}':
-        return result, current_index + 1
-    while json_string[current_index] != '':
-        if json_string[current_index] != '"':
-            raise LeptJsonParseError("lept parse miss key")
-        try:
-            key, current_index = _parse_string(json_string, current_index)
-        except LeptJsonParseError:
-            raise LeptJsonParseError("lept parse miss key")
-        current_index = _parse_whitespace(json_string, current_index)
-        if json_string[current_index] != ':':
-            raise LeptJsonParseError("lept parse miss colon")
-        current_index = _parse_whitespace(json_string, current_index + 1)
-        value, current_index = _parse_value(json_string, current_index)
-        result[key] = value
-        current_index = _parse_whitespace(json_string, current_index)
-        if json_string[current_index] != ',' and json_string[current_index] != '}':
-            raise LeptJsonParseError("lept parse miss comma or curly bracket")
-        if json_string[current_index] == '}':
-            return result, current_index + 1
-        current_index = _parse_whitespace(json_string, current_index + 1)
-    raise LeptJsonParseError("lept parse miss key")
+    result = byte & 0x7f
+    shift = 7
+    while byte & 0x80:
+        byte = data[current_index]
+        current_index += 1
+        result |= (byte & 0x7f) << shift
+        shift += 7
+    return result, current_index
 
 
-def _parse_array(json_string: _String, current_index: int) \
-        -> tuple[list[JsonBasicType], int]:
-    array: list[JsonBasicType] = []
-    current_index += 1
-    current_index = _parse_whitespace(json_string, current_index)
-    if json_string[current_index] == ']':
-        return array, current_index + 1
-    while json_string[current_index] != '':
-        value, current_index = _parse_value(json_string, current_index)
-        array.append(value)
-        current_index = _parse_whitespace(json_string, current_index)
-        if json_string[current_index] == '':
-            raise LeptJsonParseError("lept parse miss comma or square bracket")
-        if json_string[current_index] == ']':
-            return array, current_index + 1
-        if json_string[current_index] == ',':
-            current_index = _parse_whitespace(json_string, current_index + 1)
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_str(out: bytearray, value: str) -> None:
+    encoded = value.encode('utf-8', 'surrogatepass')
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _dumpb_scalar(obj: Any, out: bytearray) -> None:
+    if isinstance(obj, str):
+        out.append(BINARY_STRING)
+        _write_str(out, obj)
+    elif obj is None:
+        out.append(BINARY_NULL)
+    elif obj is True:
+        out.append(BINARY_TRUE)
+    elif obj is False:
+        out.append(BINARY_FALSE)
+    elif isinstance(obj, float):
+        # floats holding small integers, as parse returns for integral numbers,
+        # take fewer bytes as varints; -0.0 keeps its sign as a double
+        if obj.is_integer() and -BINARY_INTEGRAL_FLOAT_LIMIT < obj < BINARY_INTEGRAL_FLOAT_LIMIT and \
+                (obj or copysign(1.0, obj) > 0):
+            out.append(BINARY_INTEGRAL_FLOAT)
+            _write_zigzag(out, int(obj))
         else:
-            raise LeptJsonParseError("lept parse miss comma or square bracket")
-    raise LeptJsonParseError("lept parse miss comma or square bracket")
+            out.append(BINARY_FLOAT)
+            out += BINARY_FLOAT_STRUCT.pack(obj)
+    elif isinstance(obj, int):
+        out.append(BINARY_INT)
+        _write_zigzag(out, int(obj))
+    else:
+        raise LeptJsonStringifyError(f"Cannot dumpb instance of {type(obj)}")
 
 
-def _parse_string(json_string: _String, current_index: int) -> tuple[str, int]:
-    current_index += 1
-    buffer: list[str] = []
-    while (current_element := json_string[current_index]) != '"':
-        if current_element == '':
-            raise LeptJsonParseError("lept parse miss quotation mark")
-        if ord(current_element) < 0x20:
-            raise LeptJsonParseError("lept parse invalid string char")
-        if current_element == '\\':
-            escape_character, current_index = \
-                _parse_escape_character(json_string, current_index)
-            buffer.append(escape_character)
+def _write_zigzag(out: bytearray, value: int) -> None:
+    # small negative integers get small varints too
+    _write_varint(out, value << 1 if value >= 0 else ((-value - 1) << 1) | 1)
+
+
+def diff(source: JsonBasicType, target: JsonBasicType) -> list[dict[str, Any]]:
+    """
+    compute the JSON Patch (RFC 6902) turning source into target; subtrees which are the
+    same object in both are skipped without being compared
+    :param source:
+    :param target:
+    :return: list of add, remove and replace operations, whose values are shared with target
+    """
+    patch: list[dict[str, Any]] = []
+    # pairs of values left to compare, with their path
+    stack = [(source, target, '')]
+    while stack:
+        source, target, path = stack.pop()
+        if source is target:
+            continue
+        if isinstance(source, dict) and isinstance(target, dict):
+            for key in source:
+                if key not in target:
+                    patch.append({'op': 'remove', 'path': f"{path}/{_escape_pointer(key)}"})
+            for key, value in target.items():
+                member_path = f"{path}/{_escape_pointer(key)}"
+                if key in source:
+                    stack.append((source[key], value, member_path))
+                else:
+                    patch.append({'op': 'add', 'path': member_path, 'value': value})
+        elif isinstance(source, (list, tuple)) and isinstance(target, (list, tuple)):
+            # the elements equal at both ends are kept, and those in between aligned
+            start = 0
+            end = min(len(source), len(target))
+            while start < end and _json_equal(source[start], target[start]):
+                start += 1
+            suffix = 0
+            while suffix < end - start and _json_equal(source[-1 - suffix], target[-1 - suffix]):
+                suffix += 1
+            source_end, target_end = len(source) - suffix, len(target) - suffix
+            matches = _align_elements(source, target, start, source_end, target_end)
+            matches.append((source_end, target_end))
+            # within each gap between equal elements, the elements are compared pairwise
+            # and the rest removed or added; once the operations of the array are applied,
+            # every element compared pairwise is at its index in target
+            source_index = target_index = start
+            for source_match, target_match in matches:
+                paired = min(source_match - source_index, target_match - target_index)
+                for offset in range(paired):
+                    stack.append((source[source_index + offset], target[target_index + offset],
+                                  f"{path}/{target_index + offset}"))
+                for index in range(target_index + source_match - source_index - 1,
+                                   target_index + paired - 1, -1):
+                    patch.append({'op': 'remove', 'path': f"{path}/{index}"})
+                for index in range(target_index + paired, target_match):
+                    patch.append({'op': 'add', 'path': f"{path}/{index}", 'value': target[index]})
+                source_index, target_index = source_match + 1, target_match + 1
+        elif not _json_equal(source, target):
+            patch.append({'op': 'replace', 'path': path, 'value': target})
+    return patch
+
+
+def _align_elements(source: Sequence, target: Sequence, start: int, source_end: int,
+                    target_end: int) -> list[tuple[int, int]]:
+    """
+    find the longest common subsequence of source[start:source_end] and
+    target[start:target_end] with Myers' algorithm, whose work grows with the
+    number of elements removed and added, so that an element inserted or removed
+    does not shift the others out of line
+    :param source:
+    :param target:
+    :param start:
+    :param source_end:
+    :param target_end:
+    :return: increasing pairs of indexes of equal elements in source and target; none
+        when more than DIFF_MAX_ALIGN_EDITS elements would be removed or added
+    """
+    source_length, target_length = source_end - start, target_end - start
+    # furthest position in source reached on each diagonal, source position minus
+    # target position, and its values before each number of edits
+    furthest = {1: 0}
+    trace: list[dict[int, int]] = []
+    found = False
+    for edits in range(min(source_length + target_length, DIFF_MAX_ALIGN_EDITS) + 1):
+        trace.append(dict(furthest))
+        for diagonal in range(-edits, edits + 1, 2):
+            if diagonal == -edits or (diagonal != edits and furthest[diagonal - 1] < furthest[diagonal + 1]):
+                source_index = furthest[diagonal + 1]
+            else:
+                source_index = furthest[diagonal - 1] + 1
+            target_index = source_index - diagonal
+            while source_index < source_length and target_index < target_length and \
+                    _json_equal(source[start + source_index], target[start + target_index]):
+                source_index += 1
+                target_index += 1
+            furthest[diagonal] = source_index
+            if source_index >= source_length and target_index >= target_length:
+                found = True
+                break
+        if found:
+            break
+    if not found:
+        return []
+    # walk the path back from the end, collecting the equal elements along the diagonals
+    matches = []
+    source_index, target_index = source_length, target_length
+    for edits in range(len(trace) - 1, -1, -1):
+        if edits == 0:
+            previous_source = previous_target = source_after = target_after = 0
         else:
-            buffer.append(current_element)
-            current_index += 1
-    return ''.join(buffer), current_index + 1
+            previous = trace[edits]
+            diagonal = source_index - target_index
+            if diagonal == -edits or (diagonal != edits and previous[diagonal - 1] < previous[diagonal + 1]):
+                # an element added to target
+                previous_source = previous[diagonal + 1]
+                previous_target = previous_source - diagonal - 1
+                source_after, target_after = previous_source, previous_target + 1
+            else:
+                # an element removed from source
+                previous_source = previous[diagonal - 1]
+                previous_target = previous_source - diagonal + 1
+                source_after, target_after = previous_source + 1, previous_target
+        while source_index > source_after and target_index > target_after:
+            source_index -= 1
+            target_index -= 1
+            matches.append((start + source_index, start + target_index))
+        source_index, target_index = previous_source, previous_target
+    matches.reverse()
+    return matches
 
 
-def _parse_escape_character(json_string: _String, current_index: int) -> tuple[str, int]:
-    current_index += 1
-    current_element = json_string[current_index]
-    if current_element == '':
-        raise LeptJsonParseError("lept parse invalid string escape")
-    if current_element == 'u':
-        code_point = _str2hex(json_string, current_index + 1, 4)
-        current_index += 5
-        # unicode bigger than 0xFFFF is represented as "\uxxxx\uyyyy",
-        # where 0xdbff >= 0xxxxx >= 0xd800 and 0xdfff >= 0xyyyy >= 0xdc00
-        if 0xdbff >= code_point >= 0xd800:
-            code_point, current_index = \
-                _parse_surrogate_pair(json_string, current_index, code_point)
-        return chr(code_point), current_index
-    if current_element in ESCAPE_CHARACTER_MAPPING:
-        return ESCAPE_CHARACTER_MAPPING[current_element], current_index + 1
-    raise LeptJsonParseError("lept parse invalid string escape")
-
-
-def _parse_surrogate_pair(json_string: _String, current_index: int, high_surrogate: int) \
-        -> tuple[int, int]:
-    """
-
-    :param json_string:
-    :param current_index:
-    :param high_surrogate:
+def apply_patch(document: JsonBasicType, patch: Iterable[dict[str, Any]]) -> JsonBasicType:
+    """
+    apply a JSON Patch (RFC 6902) to document in place; the values of the patch are
+    inserted without being copied, except by copy operations
+    :param document:
+    :param patch: list of add, remove, replace, move, copy and test operations
+    :return: the patched document, a new value when the whole document is replaced
+    :raise LeptJsonPatchError: when an operation fails, the operations before it
+        are left applied
+    """
+    for index, operation in enumerate(patch):
+        try:
+            document = _apply_operation(document, operation)
+        except LeptJsonPatchError as error:
+            raise LeptJsonPatchError(error.msg, index) from None
+    return document
+
+
+def merge_diff(source: JsonBasicType, target: JsonBasicType) -> JsonBasicType:
+    """
+    compute the JSON Merge Patch (RFC 7396) turning source into target; as merge
+    patches remove the members set to null, members of target whose value is null
+    can not be represented
+    :param source:
+    :param target:
+    :return: dict of the changed members, or target itself when either is not an object
+    """
+    if not isinstance(source, dict) or not isinstance(target, dict):
+        return target
+    patch: dict[str, JsonBasicType] = {}
+    # patches of the objects changed in both, each created before those of its members
+    nested: list[tuple[dict[str, JsonBasicType], str, dict[str, JsonBasicType]]] = []
+    stack = [(source, target, patch)]
+    while stack:
+        source, target, member_patch = stack.pop()
+        for key in source:
+            if key not in target:
+                member_patch[key] = None
+        for key, value in target.items():
+            old = source.get(key, _NO_MEMBER)
+            if old is value:
+                continue
+            if isinstance(old, dict) and isinstance(value, dict):
+                member_patch[key] = {}
+                nested.append((member_patch, key, member_patch[key]))
+                stack.append((old, value, member_patch[key]))
+            elif old is _NO_MEMBER or not _json_equal(old, value):
+                member_patch[key] = value
+    # members first, so that objects left with only empty patches are dropped too
+    for member_patch, key, value in reversed(nested):
+        if not value:
+            del member_patch[key]
+    return patch
+
+
+def apply_merge_patch(document: JsonBasicType, patch: JsonBasicType) -> JsonBasicType:
+    """
+    apply a JSON Merge Patch (RFC 7396) to document in place; the values of the patch
+    are inserted without being copied
+    :param document:
+    :param patch:
+    :return: the patched document, a new value when patch or document is not an object
+    """
+    if not isinstance(patch, dict):
+        return patch
+    if not isinstance(document, dict):
+        document = {}
+    stack = [(document, patch)]
+    while stack:
+        target, member_patch = stack.pop()
+        for key, value in member_patch.items():
+            if value is None:
+                target.pop(key, None)
+            elif isinstance(value, dict):
+                member = target.get(key)
+                if not isinstance(member, dict):
+                    member = target[key] = {}
+                stack.append((member, value))
+            else:
+                target[key] = value
+    return document
+
+
+def _apply_operation(document: JsonBasicType, operation: dict[str, Any]) -> JsonBasicType:
+    """
+    :param document:
+    :param operation:
+    :return: the patched document
+    """
+    if not isinstance(operation, dict) or not isinstance(operation.get('path'), str):
+        raise LeptJsonPatchError("lept patch invalid operation")
+    op = operation.get('op')
+    tokens = _parse_pointer(operation['path'])
+    if op == 'move' or op == 'copy':
+        if not isinstance(operation.get('from'), str):
+            raise LeptJsonPatchError("lept patch invalid operation")
+        from_tokens = _parse_pointer(operation['from'])
+        value = _resolve_pointer(document, from_tokens)
+        if op == 'copy':
+            return _patch_add(document, tokens, _copy_tree(value))
+        if len(tokens) > len(from_tokens) and tokens[:len(from_tokens)] == from_tokens:
+            # a value can not be moved into one of its own members
+            raise LeptJsonPatchError("lept patch invalid operation")
+        return _patch_add(_patch_remove(document, from_tokens), tokens, value)
+    if op == 'remove':
+        return _patch_remove(document, tokens)
+    if op not in ('add', 'replace', 'test') or 'value' not in operation:
+        raise LeptJsonPatchError("lept patch invalid operation")
+    value = operation['value']
+    if op == 'add':
+        return _patch_add(document, tokens, value)
+    if op == 'test':
+        if not _json_equal(_resolve_pointer(document, tokens), value):
+            raise LeptJsonPatchError("lept patch test failed")
+        return document
+    if not tokens:
+        return value
+    container, token = _resolve_parent(document, tokens)
+    if isinstance(container, dict):
+        if token not in container:
+            raise LeptJsonPatchError("lept patch path not found")
+        container[token] = value
+    else:
+        container[_array_index(token, len(container))] = value
+    return document
+
+
+def _patch_add(document: JsonBasicType, tokens: list[str], value: JsonBasicType) -> JsonBasicType:
+    if not tokens:
+        return value
+    container, token = _resolve_parent(document, tokens)
+    if isinstance(container, dict):
+        container[token] = value
+    elif token == '-':
+        container.append(value)
+    else:
+        container.insert(_array_index(token, len(container) + 1), value)
+    return document
+
+
+def _patch_remove(document: JsonBasicType, tokens: list[str]) -> JsonBasicType:
+    if not tokens:
+        raise LeptJsonPatchError("lept patch invalid operation")
+    container, token = _resolve_parent(document, tokens)
+    if isinstance(container, dict):
+        if token not in container:
+            raise LeptJsonPatchError("lept patch path not found")
+        del container[token]
+    else:
+        del container[_array_index(token, len(container))]
+    return document
+
+
+def _parse_pointer(pointer: str) -> list[str]:
+    """
+    :param pointer: JSON Pointer (RFC 6901), e.g. "/a/0/b~1c"
+    :return: its reference tokens, unescaped
+    """
+    if not pointer:
+        return []
+    if pointer[0] != '/' or POINTER_INVALID_ESCAPE_RE.search(pointer):
+        raise LeptJsonPatchError("lept patch invalid pointer")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _escape_pointer(key: str) -> str:
+    return key.replace('~', '~0').replace('/', '~1')
+
+
+def _resolve_pointer(document: JsonBasicType, tokens: list[str]) -> JsonBasicType:
+    for token in tokens:
+        if isinstance(document, dict):
+            if token not in document:
+                raise LeptJsonPatchError("lept patch path not found")
+            document = document[token]
+        elif isinstance(document, list):
+            document = document[_array_index(token, len(document))]
+        else:
+            raise LeptJsonPatchError("lept patch path not found")
+    return document
+
+
+def _resolve_parent(document: JsonBasicType, tokens: list[str]) -> tuple[Union[dict, list], str]:
+    """
+    :param document:
+    :param tokens: tokens of a pointer which is not the whole document
+    :return: the object or array holding the value the pointer refers to, and the last token
+    """
+    container = _resolve_pointer(document, tokens[:-1])
+    if not isinstance(container, (dict, list)):
+        raise LeptJsonPatchError("lept patch path not found")
+    return container, tokens[-1]
+
+
+def _array_index(token: str, limit: int) -> int:
+    """
+    :param token:
+    :param limit: indexes must be smaller than limit
+    :return: the array index token stands for
+    """
+    if POINTER_INDEX_RE.fullmatch(token) is None or int(token) >= limit:
+        raise LeptJsonPatchError("lept patch path not found")
+    return int(token)
+
+
+def _json_equal(first: JsonBasicType, second: JsonBasicType) -> bool:
+    """
+    compare two values as json, where unlike with == true is not equal to 1
+    :param first:
+    :param second:
     :return:
     """
-    if json_string[current_index] != '\\' or json_string[current_index + 1] != 'u':
-        raise LeptJsonParseError("lept parse invalid unicode surrogate")
-    current_index += 2
-    low_surrogate = _str2hex(json_string, current_index, 4)
-    if 0xdfff >= low_surrogate >= 0xdc00:
-        # the formulae to compute unicode from surrogate pair
-        return 0x10000 + (high_surrogate - 0xd800) * 0x400 + (low_surrogate - 0xdc00), \
-               current_index + 4
-    raise LeptJsonParseError("lept parse invalid unicode surrogate")
+    stack = [(first, second)]
+    while stack:
+        first, second = stack.pop()
+        if first is second:
+            continue
+        if isinstance(first, dict):
+            if not isinstance(second, dict) or first.keys() != second.keys():
+                return False
+            stack.extend((value, second[key]) for key, value in first.items())
+        elif isinstance(first, (list, tuple)):
+            if not isinstance(second, (list, tuple)) or len(first) != len(second):
+                return False
+            stack.extend(zip(first, second))
+        elif isinstance(second, (dict, list, tuple)) or isinstance(first, bool) != isinstance(second, bool) \
+                or first != second:
+            return False
+    return True
+
+
+class LazyObject(Mapping):
+    """
+    Read-only view of a json object returned by parse_lazy
+    """
+
+    def __init__(self, scanner: '_Scanner', current_index: int):
+        self._scanner = scanner
+        self._start = current_index
+        self._members: Optional[dict[str, Any]] = None
+
+    def _load(self) -> dict[str, Any]:
+        if self._members is None:
+            self._members = self._scanner.parse_lazy_object(self._start)
+        return self._members
+
+    def __getitem__(self, key: str) -> Any:
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (dict, LazyObject)):
+            return _lazy_equal(self, other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LazyObject({self._load()!r})"
+
+    def materialize(self) -> dict[str, JsonBasicType]:
+        """
+        :return: the object as parse would return it
+        """
+        return _materialize(self)
+
+
+class LazyArray(Sequence):
+    """
+    Read-only view of a json array returned by parse_lazy
+    """
+
+    def __init__(self, scanner: '_Scanner', current_index: int):
+        self._scanner = scanner
+        self._start = current_index
+        self._elements: Optional[list[Any]] = None
+
+    def _load(self) -> list[Any]:
+        if self._elements is None:
+            self._elements = self._scanner.parse_lazy_array(self._start)
+        return self._elements
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        return self._load()[index]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (list, LazyArray)):
+            return _lazy_equal(self, other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LazyArray({self._load()!r})"
+
+    def materialize(self) -> list[JsonBasicType]:
+        """
+        :return: the array as parse would return it
+        """
+        return _materialize(self)
 
 
-def _str2hex(json_string: _String, current_index: int, hex_length: int) -> int:
+def _materialize(value: Any) -> JsonBasicType:
     """
-    convert hexadecimal string to decimal
-    :param json_string:
-    :param current_index: start position of hexadecimal string
-    :param hex_length: length of hexadecimal string
+    :param value:
+    :return: value with dicts and lists in place of the views, built without recursing
+    """
+    if not isinstance(value, (LazyObject, LazyArray)):
+        return value
+    # every view, parents before their members
+    views = []
+    stack = [value]
+    while stack:
+        view = stack.pop()
+        views.append(view)
+        members = view._load().values() if isinstance(view, LazyObject) else view._load()
+        stack.extend(member for member in members if isinstance(member, (LazyObject, LazyArray)))
+    built: dict[int, JsonBasicType] = {}
+    for view in reversed(views):
+        if isinstance(view, LazyObject):
+            built[id(view)] = {key: built.get(id(member), member) for key, member in view._load().items()}
+        else:
+            built[id(view)] = [built.get(id(member), member) for member in view._load()]
+    return built[id(value)]
+
+
+def _lazy_equal(first: Any, second: Any) -> bool:
+    """
+    == between values made of dicts, lists and views, without recursing
+    :param first:
+    :param second:
     :return:
     """
-    assert hex_length >= 0
-    if json_string[current_index + hex_length - 1] == '':
-        raise LeptJsonParseError("lept parse invalid unicode hex")
-    hexadecimal_string = json_string[current_index:current_index + hex_length]
-    if all(character in hexdigits for character in hexadecimal_string):
-        return int(hexadecimal_string, 16)
-    raise LeptJsonParseError("lept parse invalid unicode hex")
+    stack = [(first, second)]
+    while stack:
+        first, second = stack.pop()
+        if first is second:
+            continue
+        if isinstance(first, (dict, LazyObject)):
+            if not isinstance(second, (dict, LazyObject)) or len(first) != len(second):
+                return False
+            for key, value in first.items():
+                if key not in second:
+                    return False
+                stack.append((value, second[key]))
+        elif isinstance(first, (list, LazyArray)):
+            if not isinstance(second, (list, LazyArray)) or len(first) != len(second):
+                return False
+            stack.extend(zip(first, second))
+        elif isinstance(second, (dict, LazyObject, list, LazyArray)) or first != second:
+            return False
+    return True
+
+
+class _Scanner:
+    """
+    Recursive descent parser over a json string.
 
+    Runs of whitespace, unescaped string characters and whole number tokens
+    are consumed in one step with precompiled patterns, instead of being read
+    one character at a time.
+    """
 
-def _parse_literal(json_string: _String, current_index: int, literal: str,
-                   return_value: Optional[bool]) -> tuple[Optional[bool], int]:
-    if json_string[current_index:current_index + len(literal)] == literal:
-        return return_value, current_index + len(literal)
-    raise LeptJsonParseError("lept parse invalid value")
+    # tokens and patterns of the grammar, which _BytesScanner has as bytes
+    QUOTE = '"'
+    BACKSLASH = '\\'
+    NEWLINE = '\n'
+    BEGIN_OBJECT = '{'
+    END_OBJECT = '}'
+    BEGIN_ARRAY = '['
+    END_ARRAY = ']'
+    VALUE_SEPARATOR = ','
+    UNICODE_ESCAPE = '\\u'
+    UNICODE_ESCAPE_MARK = 'u'
+    DECIMAL_POINT = '.'
+    EXPONENT_MARKS = ('e', 'E')
+    LITERALS: dict[Any, tuple[Any, Optional[bool]]] = \
+        {'n': ('null', None), 't': ('true', True), 'f': ('false', False)}
+    LITERAL_NULL = 'null'
+    ESCAPES: dict[Any, str] = ESCAPE_CHARACTER_MAPPING
+    SCALAR_EVENTS: dict[Any, str] = SCALAR_EVENTS
+    WHITESPACE_RE = WHITESPACE_RE
+    STRING_CHUNK_RE = STRING_CHUNK_RE
+    NUMBER_RE = NUMBER_RE
+    HEX4_RE = HEX4_RE
+    NAME_SEPARATOR_RE = NAME_SEPARATOR_RE
+    NUMERIC_ARRAY_RE = NUMERIC_ARRAY_RE
+    STRING_RE = STRING_RE
+    SKIP_RE = SKIP_RE
 
+    def __init__(self, string: Any, max_depth: int = DEFAULT_MAX_DEPTH,
+                 parse_float: Optional[Callable[[str], Any]] = None,
+                 parse_int: Optional[Callable[[str], Any]] = None,
+                 keys: Optional[dict[Any, str]] = None, key_cache_size: int = DEFAULT_KEY_CACHE_SIZE,
+                 numeric_arrays: bool = False, duplicate_keys: str = 'last'):
+        self._string = string
+        self._max_depth = max_depth
+        self._parse_float = parse_float
+        self._parse_int = parse_int
+        # object keys decoded so far, from the raw text of a key without escapes
+        self._keys = {} if keys is None else keys
+        self._key_cache_size = key_cache_size
+        # numbers are only floats without parse_float and parse_int
+        self._numeric_arrays = numeric_arrays and parse_float is None and parse_int is None
+        self._duplicate_keys = duplicate_keys
+        # filled by parse_lazy
+        self._container_ends: dict[int, int] = {}
 
-def _parse_number(json_string: _String, current_index: int) -> tuple[float, int]:
-    end_index = _parse_number_aux(json_string, current_index)
-    result = float(json_string[current_index:end_index])
-    if result == float("Inf") or result == float("-Inf"):
-        raise LeptJsonParseError("lept parse number too big")
-    return result, end_index
+    def parse(self) -> JsonBasicType:
+        """
+        parse the whole string as a single json value
+        :return:
+        """
+        current_index = self._parse_whitespace(0)
+        result, current_index = self._parse_value(current_index)
+        current_index = self._parse_whitespace(current_index)
+        if current_index == len(self._string):
+            return result
+        raise self._error("lept parse root not singular", current_index)
 
+    def select(self, selectors: Iterable[str]) -> dict[str, list[JsonBasicType]]:
+        """
+        parse the whole string as a single json value, building only the values
+        matched by selectors; the other values are skipped over
+        :param selectors:
+        :return: dict from each selector to the list of values it matches
+        """
+        results: dict[str, list[JsonBasicType]] = {selector: [] for selector in selectors}
+        active = [(matches, _compile_selector(selector)) for selector, matches in results.items()]
+        current_index = self._parse_whitespace(0)
+        if active:
+            current_index = self._select_value(current_index, active)
+        else:
+            current_index = self._skip_value(current_index)
+        current_index = self._parse_whitespace(current_index)
+        if current_index == len(self._string):
+            return results
+        raise self._error("lept parse root not singular", current_index)
 
-def _parse_number_aux(json_string: _String, current_index: int) -> int:
-    current_index = _parse_negative(json_string, current_index)
-    current_index = _parse_int(json_string, current_index)
-    current_index = _parse_fraction(json_string, current_index)
-    return _parse_exp(json_string, current_index)
+    def parse_lazy(self) -> Union[JsonBasicType, LazyObject, LazyArray]:
+        """
+        index where every object and array ends, then parse the string as a single
+        json value whose objects and arrays are parsed on first access
+        :return:
+        """
+        self._container_ends = self._index_containers()
+        current_index = self._parse_whitespace(0)
+        result, current_index = self._parse_lazy_value(current_index)
+        current_index = self._parse_whitespace(current_index)
+        if current_index == len(self._string):
+            return result
+        raise self._error("lept parse root not singular", current_index)
 
+    def parse_lazy_object(self, current_index: int) -> dict[str, Any]:
+        """
+        :param current_index: position of the object
+        :return: members of the object, with views in place of objects and arrays
+        """
+        string = self._string
+        length = len(string)
+        result: dict[str, Any] = {}
+        current_index = self._parse_whitespace(current_index + 1)
+        if current_index == length:
+            raise self._error("lept parse miss key", current_index)
+        if string[current_index:current_index + 1] == self.END_OBJECT:
+            return result
+        while current_index < length:
+            key, current_index = self._parse_key(current_index)
+            result[key], current_index = self._parse_lazy_value(current_index)
+            current_index = self._parse_whitespace(current_index)
+            element = string[current_index:current_index + 1]
+            if element == self.END_OBJECT:
+                return result
+            if element != self.VALUE_SEPARATOR:
+                raise self._error("lept parse miss comma or curly bracket", current_index)
+            current_index = self._parse_whitespace(current_index + 1)
+        raise self._error("lept parse miss key", current_index)
 
-def _parse_negative(json_string: _String, current_index: int) -> int:
-    if json_string[current_index] == '-':
-        return current_index + 1
-    return current_index
+    def parse_lazy_array(self, current_index: int) -> list[Any]:
+        """
+        :param current_index: position of the array
+        :return: elements of the array, with views in place of objects and arrays
+        """
+        string = self._string
+        length = len(string)
+        array: list[Any] = []
+        current_index = self._parse_whitespace(current_index + 1)
+        if string[current_index:current_index + 1] == self.END_ARRAY:
+            return array
+        while current_index < length:
+            value, current_index = self._parse_lazy_value(current_index)
+            array.append(value)
+            current_index = self._parse_whitespace(current_index)
+            element = string[current_index:current_index + 1]
+            if element == self.END_ARRAY:
+                return array
+            if element != self.VALUE_SEPARATOR:
+                raise self._error("lept parse miss comma or square bracket", current_index)
+            current_index = self._parse_whitespace(current_index + 1)
+        raise self._error("lept parse miss comma or square bracket", current_index)
 
+    def iter_events(self) -> Iterator[JsonEvent]:
+        """
+        walk the string as a single json value without building containers
+        :return: iterator over (event, value, path) tuples
+        """
+        string = self._string
+        length = len(string)
+        # whether each container being walked is an object, innermost last
+        stack: list[bool] = []
+        # key or index of the current value in each container
+        path: list[Union[str, int]] = []
+        current_index = self._parse_whitespace(0)
+        while True:
+            element = string[current_index:current_index + 1]
+            if (element == self.BEGIN_OBJECT or element == self.BEGIN_ARRAY) and \
+                    len(stack) == self._max_depth:
+                raise self._error("lept parse max depth exceeded", current_index)
+            if element == self.BEGIN_OBJECT:
+                yield 'start_map', None, tuple(path)
+                current_index = self._parse_whitespace(current_index + 1)
+                if string[current_index:current_index + 1] == self.END_OBJECT:
+                    yield 'end_map', None, tuple(path)
+                    current_index += 1
+                else:
+                    key, current_index = self._parse_key(current_index)
+                    yield 'map_key', key, tuple(path)
+                    stack.append(True)
+                    path.append(key)
+                    continue
+            elif element == self.BEGIN_ARRAY:
+                yield 'start_array', None, tuple(path)
+                current_index = self._parse_whitespace(current_index + 1)
+                if string[current_index:current_index + 1] == self.END_ARRAY:
+                    yield 'end_array', None, tuple(path)
+                    current_index += 1
+                elif current_index == length:
+                    raise self._error("lept parse miss comma or square bracket", current_index)
+                else:
+                    stack.append(False)
+                    path.append(0)
+                    continue
+            else:
+                value, current_index = self._parse_value(current_index)
+                yield self.SCALAR_EVENTS.get(element, 'number'), value, tuple(path)
+            # find the next value, closing the containers that end here
+            while True:
+                current_index = self._parse_whitespace(current_index)
+                if not stack:
+                    if current_index == length:
+                        return
+                    raise self._error("lept parse root not singular", current_index)
+                element = string[current_index:current_index + 1]
+                if stack[-1]:
+                    if element == self.END_OBJECT:
+                        stack.pop()
+                        path.pop()
+                        yield 'end_map', None, tuple(path)
+                        current_index += 1
+                        continue
+                    if element != self.VALUE_SEPARATOR:
+                        raise self._error("lept parse miss comma or curly bracket", current_index)
+                    key, current_index = self._parse_key(
+                        self._parse_whitespace(current_index + 1))
+                    path[-1] = key
+                    yield 'map_key', key, tuple(path[:-1])
+                    break
+                if element == self.END_ARRAY:
+                    stack.pop()
+                    path.pop()
+                    yield 'end_array', None, tuple(path)
+                    current_index += 1
+                    continue
+                if element != self.VALUE_SEPARATOR:
+                    raise self._error("lept parse miss comma or square bracket", current_index)
+                current_index = self._parse_whitespace(current_index + 1)
+                if current_index == length:
+                    raise self._error("lept parse miss comma or square bracket", current_index)
+                path[-1] += 1
+                break
 
-def _parse_int(json_string: _String, current_index: int) -> int:
-    if json_string[current_index] == '':
-        raise LeptJsonParseError("lept parse invalid value")
-    if json_string[current_index] == '0':
-        return current_index + 1
-    if json_string[current_index] in POSITIVE_INTEGERS_SET:
-        while json_string[current_index] in NONNEGATIVE_INTEGERS_SET:
-            current_index += 1
-        return current_index
-    raise LeptJsonParseError("lept parse invalid value")
+    def _select_value(self, current_index: int,
+                      active: list[tuple[list[JsonBasicType], SelectorSteps]]) -> int:
+        """
+        :param current_index:
+        :param active: selectors that matched the path of this value so far, as tuples of
+            the list collecting their matches and their remaining steps
+        :return: the position after the json value
+        """
+        if any(not steps for _, steps in active):
+            value, current_index = self._parse_value(current_index)
+            for matches, steps in active:
+                _select_from(value, steps, matches)
+            return current_index
+        element = self._string[current_index:current_index + 1]
+        if element == self.BEGIN_OBJECT:
+            return self._select_object(current_index, active)
+        if element == self.BEGIN_ARRAY:
+            return self._select_array(current_index, active)
+        # a scalar cannot match selectors with steps left
+        return self._skip_value(current_index)
 
+    def _select_object(self, current_index: int,
+                       active: list[tuple[list[JsonBasicType], SelectorSteps]]) -> int:
+        string = self._string
+        length = len(string)
+        current_index = self._parse_whitespace(current_index + 1)
+        if current_index == length:
+            raise self._error("lept parse miss key", current_index)
+        if string[current_index:current_index + 1] == self.END_OBJECT:
+            return current_index + 1
+        while current_index < length:
+            key, current_index = self._parse_key(current_index)
+            children = [(matches, steps[1:]) for matches, steps in active
+                        if steps[0] is None or steps[0] == key]
+            if children:
+                current_index = self._select_value(current_index, children)
+            else:
+                current_index = self._skip_value(current_index)
+            current_index = self._parse_whitespace(current_index)
+            element = string[current_index:current_index + 1]
+            if element == self.END_OBJECT:
+                return current_index + 1
+            if element != self.VALUE_SEPARATOR:
+                raise self._error("lept parse miss comma or curly bracket", current_index)
+            current_index = self._parse_whitespace(current_index + 1)
+        raise self._error("lept parse miss key", current_index)
 
-def _parse_fraction(json_string: _String, current_index: int) -> int:
-    if json_string[current_index] == '' or json_string[current_index] != '.':
-        return current_index
-    current_index += 1
-    if json_string[current_index] in NONNEGATIVE_INTEGERS_SET:
-        while json_string[current_index] in NONNEGATIVE_INTEGERS_SET:
+    def _select_array(self, current_index: int,
+                      active: list[tuple[list[JsonBasicType], SelectorSteps]]) -> int:
+        string = self._string
+        length = len(string)
+        current_index = self._parse_whitespace(current_index + 1)
+        if string[current_index:current_index + 1] == self.END_ARRAY:
+            return current_index + 1
+        array_index = 0
+        while current_index < length:
+            children = [(matches, steps[1:]) for matches, steps in active
+                        if steps[0] is None or steps[0] == array_index]
+            if children:
+                current_index = self._select_value(current_index, children)
+            else:
+                current_index = self._skip_value(current_index)
+            current_index = self._parse_whitespace(current_index)
+            element = string[current_index:current_index + 1]
+            if element == self.END_ARRAY:
+                return current_index + 1
+            if element != self.VALUE_SEPARATOR:
+                raise self._error("lept parse miss comma or square bracket", current_index)
+            current_index = self._parse_whitespace(current_index + 1)
+            array_index += 1
+        raise self._error("lept parse miss comma or square bracket", current_index)
+
+    def _index_containers(self) -> dict[int, int]:
+        """
+        skim the whole string once, balancing quotes and brackets
+        :return: dict from the position of every object and array to the position after it
+        """
+        string = self._string
+        container_ends: dict[int, int] = {}
+        container_starts: list[int] = []
+        current_index = 0
+        while True:
+            current_index = self.SKIP_RE.match(string, current_index).end()
+            token = string[current_index:current_index + 1]
+            if token == self.BEGIN_OBJECT or token == self.BEGIN_ARRAY:
+                if len(container_starts) == self._max_depth:
+                    raise self._error("lept parse max depth exceeded", current_index)
+                container_starts.append(current_index)
+            elif (token == self.END_OBJECT or token == self.END_ARRAY) and container_starts:
+                container_ends[container_starts.pop()] = current_index + 1
+            else:
+                break
             current_index += 1
-        return current_index
-    raise LeptJsonParseError("lept parse invalid value")
+        if container_starts or current_index < len(string):
+            # unbalanced, let the parser report what is wrong
+            self.parse()
+        return container_ends
 
+    def _split_array(self, shard_size: int) -> Optional[list[tuple[int, int]]]:
+        """
+        skim a root array, balancing quotes and brackets, to split its elements
+        into ranges after an array or object element, once a range is at least
+        shard_size long
+        :param shard_size:
+        :return: list of the start and end of the ranges, the separators between them
+            left out; None if the root is not an array or the skim fails
+        """
+        string = self._string
+        current_index = self._parse_whitespace(0)
+        if string[current_index:current_index + 1] != self.BEGIN_ARRAY:
+            return None
+        segments: list[tuple[int, int]] = []
+        start = current_index + 1
+        # number of open arrays and objects inside the root
+        depth = 0
+        while True:
+            current_index = self.SKIP_RE.match(string, current_index + 1).end()
+            token = string[current_index:current_index + 1]
+            if token == self.BEGIN_OBJECT or token == self.BEGIN_ARRAY:
+                depth += 1
+            elif token == self.END_OBJECT or token == self.END_ARRAY:
+                if depth == 0:
+                    break
+                depth -= 1
+                if depth == 0 and current_index + 1 - start >= shard_size:
+                    separator = self._parse_whitespace(current_index + 1)
+                    if string[separator:separator + 1] == self.VALUE_SEPARATOR:
+                        segments.append((start, current_index + 1))
+                        start = separator + 1
+                        current_index = separator
+            else:
+                return None
+        if token != self.END_ARRAY or self._parse_whitespace(current_index + 1) != len(string):
+            return None
+        if segments and self._parse_whitespace(start) == current_index:
+            # a separator before the closing bracket
+            return None
+        segments.append((start, current_index))
+        return segments
 
-def _parse_exp(json_string: _String, current_index: int) -> int:
-    if json_string[current_index] == '' or (
-            json_string[current_index] != 'e' and json_string[current_index] != 'E'):
-        return current_index
-    current_index += 1
-    if json_string[current_index] == '':
-        raise LeptJsonParseError("lept parse invalid value")
-    if json_string[current_index] == '-' or json_string[current_index] == '+':
+    def _parse_lazy_value(self, current_index: int) -> tuple[Any, int]:
+        element = self._string[current_index:current_index + 1]
+        if element == self.BEGIN_OBJECT:
+            return LazyObject(self, current_index), self._container_ends[current_index]
+        if element == self.BEGIN_ARRAY:
+            return LazyArray(self, current_index), self._container_ends[current_index]
+        return self._parse_value(current_index)
+
+    def _skip_value(self, current_index: int) -> int:
+        """
+        skip over a json value without building it; strings, arrays and objects
+        are only checked for balanced quotes and brackets
+        :param current_index:
+        :return: the position after the json value
+        """
+        string = self._string
+        element = string[current_index:current_index + 1]
+        if element == self.QUOTE:
+            match = self.STRING_RE.match(string, current_index)
+            if match is not None:
+                return match.end()
+        elif element == self.BEGIN_OBJECT or element == self.BEGIN_ARRAY:
+            depth = 0
+            skip_index = current_index
+            while True:
+                skip_index = self.SKIP_RE.match(string, skip_index).end()
+                token = string[skip_index:skip_index + 1]
+                skip_index += 1
+                if token == self.BEGIN_OBJECT or token == self.BEGIN_ARRAY:
+                    depth += 1
+                elif token == self.END_OBJECT or token == self.END_ARRAY:
+                    depth -= 1
+                    if depth == 0:
+                        return skip_index
+                else:
+                    # end of string, or an unterminated string
+                    break
+        # scalars are cheap enough to parse, and the parser reports what an
+        # unbalanced value misses
+        return self._parse_value(current_index)[1]
+
+    def _decode(self, start: int, end: int) -> str:
+        """
+        :param start:
+        :param end:
+        :return: the text between start and end
+        """
+        return self._string[start:end]
+
+    def _error(self, msg: str, current_index: int) -> LeptJsonParseError:
+        """
+        the line, column and excerpt are only worked out here, once parsing has failed
+        :param msg:
+        :param current_index: where the error was found
+        :return:
+        """
+        string = self._string
+        newline = self.NEWLINE
+        # memory-mapped files have no count method
+        lineno = string[:current_index].count(newline) + 1
+        line_start = string.rfind(newline, 0, current_index) + 1
+        line_end = string.find(newline, current_index)
+        if line_end == -1:
+            line_end = len(string)
+        excerpt_start = max(line_start, current_index - ERROR_EXCERPT_LENGTH)
+        excerpt_end = min(line_end, current_index + ERROR_EXCERPT_LENGTH)
+        colno = len(self._decode_lossy(line_start, current_index)) + 1
+        return LeptJsonParseError(msg, lineno, colno=colno, pos=current_index,
+                                  excerpt=self._decode_lossy(excerpt_start, excerpt_end))
+
+    def _decode_lossy(self, start: int, end: int) -> str:
+        return self._string[start:end]
+
+    def _parse_whitespace(self, current_index: int) -> int:
+        """
+        :param current_index:
+        :return: the position after whitespace
+        """
+        return self.WHITESPACE_RE.match(self._string, current_index).end()
+
+    def _parse_value(self, current_index: int) -> tuple[JsonBasicType, int]:
+        """
+        objects and arrays being parsed are kept on an explicit stack instead of
+        recursing into them, so nesting is only limited by max_depth
+        :param current_index:
+        :return: tuple of a json value and the position after the json value
+        """
+        string = self._string
+        length = len(string)
+        # objects and arrays being parsed, innermost last
+        stack: list[Union[dict[str, JsonBasicType], list[JsonBasicType]]] = []
+        # key of the member being parsed in each object, None for arrays
+        keys: list[Optional[str]] = []
+        # the default policy, keeping the last value, costs no check
+        reject_duplicates = self._duplicate_keys == 'error'
+        merge_duplicates = self._duplicate_keys == 'first' or self._duplicate_keys == 'collect'
+        while True:
+            element = string[current_index:current_index + 1]
+            if element == self.QUOTE:
+                value, current_index = self._parse_string(current_index)
+            elif element == self.BEGIN_OBJECT:
+                if len(stack) == self._max_depth:
+                    raise self._error("lept parse max depth exceeded", current_index)
+                current_index = self._parse_whitespace(current_index + 1)
+                if string[current_index:current_index + 1] == self.END_OBJECT:
+                    value = {}
+                    current_index += 1
+                else:
+                    key, current_index = self._parse_key(current_index)
+                    stack.append({})
+                    keys.append(key)
+                    continue
+            elif element == self.BEGIN_ARRAY:
+                if len(stack) == self._max_depth:
+                    raise self._error("lept parse max depth exceeded", current_index)
+                numbers = self._parse_numeric_array(current_index) if self._numeric_arrays else None
+                if numbers is not None:
+                    value, current_index = numbers
+                else:
+                    current_index = self._parse_whitespace(current_index + 1)
+                    if string[current_index:current_index + 1] == self.END_ARRAY:
+                        value = []
+                        current_index += 1
+                    elif current_index == length:
+                        raise self._error("lept parse miss comma or square bracket", current_index)
+                    else:
+                        stack.append([])
+                        keys.append(None)
+                        continue
+            elif not element:
+                raise self._error("lept parse expect value", current_index)
+            elif element in self.LITERALS:
+                value, current_index = \
+                    self._parse_literal(current_index, *self.LITERALS[element])
+            else:
+                value, current_index = self._parse_number(current_index)
+            # add the value to the innermost container, closing the containers that end here
+            while stack:
+                current_index = self._parse_whitespace(current_index)
+                element = string[current_index:current_index + 1]
+                container = stack[-1]
+                key = keys[-1]
+                if key is not None:
+                    if merge_duplicates and (type(container) is ObjectPairs or key in container):
+                        self._merge_duplicate(stack, key, value)
+                    else:
+                        container[key] = value
+                    if element == self.VALUE_SEPARATOR:
+                        key_index = self._parse_whitespace(current_index + 1)
+                        keys[-1], current_index = self._parse_key(key_index)
+                        if reject_duplicates and keys[-1] in container:
+                            raise self._error("lept parse duplicate key", key_index)
+                        break
+                    if element != self.END_OBJECT:
+                        raise self._error("lept parse miss comma or curly bracket", current_index)
+                else:
+                    container.append(value)
+                    if element == self.VALUE_SEPARATOR:
+                        current_index = self._parse_whitespace(current_index + 1)
+                        if current_index == length:
+                            raise self._error("lept parse miss comma or square bracket", current_index)
+                        break
+                    if element != self.END_ARRAY:
+                        raise self._error("lept parse miss comma or square bracket", current_index)
+                value = stack.pop()
+                keys.pop()
+                current_index += 1
+            else:
+                return value, current_index
+
+    def _merge_duplicate(self, stack: list[Any], key: str, value: JsonBasicType) -> None:
+        """
+        add a member to the innermost object, whose key may already be there
+        :param stack: containers being parsed, the innermost object last
+        :param key:
+        :param value:
+        :return:
+        """
+        if self._duplicate_keys == 'first':
+            return
+        container = stack[-1]
+        if type(container) is not ObjectPairs:
+            # from the first repeated key on, the object is kept as a list of its members
+            container = stack[-1] = ObjectPairs(container.items())
+        container.append((key, value))
+
+    def _parse_numeric_array(self, current_index: int) -> Optional[tuple[array.array, int]]:
+        """
+        parse an array made only of numbers in one match, without boxing them in a list
+        :param current_index: position of the opening bracket
+        :return: tuple of the numbers as array.array('d') and the position after the array;
+            None when the array holds anything else, or numbers too big, which are then
+            left to _parse_value
+        """
+        match = self.NUMERIC_ARRAY_RE.match(self._string, current_index)
+        if match is None:
+            return None
+        # float strips the whitespace around each number, and reads bytes too
+        numbers = array.array('d', map(float, match.group(1).split(self.VALUE_SEPARATOR)))
+        if inf in numbers or -inf in numbers:
+            return None
+        return numbers, match.end()
+
+    def _parse_key(self, current_index: int) -> tuple[str, int]:
+        """
+        parse an object member name and the colon following it
+        :param current_index:
+        :return: tuple of the key and the position of the member value
+        """
+        string = self._string
+        if string[current_index:current_index + 1] != self.QUOTE:
+            raise self._error("lept parse miss key", current_index)
+        start = current_index + 1
+        end = self.STRING_CHUNK_RE.match(string, start).end()
+        if string[end:end + 1] == self.QUOTE:
+            # a key without escapes is looked up by its raw text,
+            # so that repeated keys are decoded once and share one str
+            raw = string[start:end]
+            key = self._keys.get(raw)
+            if key is None:
+                try:
+                    key = self._decode(start, end)
+                except LeptJsonParseError:
+                    raise self._error("lept parse miss key", current_index)
+                if len(self._keys) < self._key_cache_size:
+                    self._keys[raw] = key
+            current_index = end + 1
+        else:
+            try:
+                key, current_index = self._parse_string(current_index)
+            except LeptJsonParseError:
+                raise self._error("lept parse miss key", current_index)
+        match = self.NAME_SEPARATOR_RE.match(string, current_index)
+        if match is None:
+            raise self._error("lept parse miss colon", current_index)
+        return key, match.end()
+
+    def _parse_string(self, current_index: int) -> tuple[str, int]:
+        string = self._string
         current_index += 1
-    if json_string[current_index] == '':
-        raise LeptJsonParseError("lept parse invalid value")
-    if json_string[current_index] in NONNEGATIVE_INTEGERS_SET:
-        while json_string[current_index] in NONNEGATIVE_INTEGERS_SET:
-            current_index += 1
-        return current_index
-    raise LeptJsonParseError("lept parse invalid value")
+        chunk_end = self.STRING_CHUNK_RE.match(string, current_index).end()
+        # fast path: no escape sequence in the string
+        if string[chunk_end:chunk_end + 1] == self.QUOTE:
+            return self._decode(current_index, chunk_end), chunk_end + 1
+        buffer: list[str] = []
+        while True:
+            if chunk_end != current_index:
+                buffer.append(self._decode(current_index, chunk_end))
+            current_index = chunk_end
+            current_element = string[current_index:current_index + 1]
+            if current_element == self.QUOTE:
+                return ''.join(buffer), current_index + 1
+            if not current_element:
+                raise self._error("lept parse miss quotation mark", current_index)
+            if current_element != self.BACKSLASH:
+                # the chunk pattern only stops at control characters otherwise
+                raise self._error("lept parse invalid string char", current_index)
+            escape_character, current_index = self._parse_escape_character(current_index)
+            buffer.append(escape_character)
+            chunk_end = self.STRING_CHUNK_RE.match(string, current_index).end()
+
+    def _parse_escape_character(self, current_index: int) -> tuple[str, int]:
+        current_index += 1
+        current_element = self._string[current_index:current_index + 1]
+        if current_element == self.UNICODE_ESCAPE_MARK:
+            code_point = self._str2hex(current_index + 1)
+            current_index += 5
+            # unicode bigger than 0xFFFF is represented as "\uxxxx\uyyyy",
+            # where 0xdbff >= 0xxxxx >= 0xd800 and 0xdfff >= 0xyyyy >= 0xdc00
+            if 0xdbff >= code_point >= 0xd800:
+                code_point, current_index = \
+                    self._parse_surrogate_pair(current_index, code_point)
+            return chr(code_point), current_index
+        if current_element in self.ESCAPES:
+            return self.ESCAPES[current_element], current_index + 1
+        raise self._error("lept parse invalid string escape", current_index)
+
+    def _parse_surrogate_pair(self, current_index: int, high_surrogate: int) \
+            -> tuple[int, int]:
+        """
+
+        :param current_index:
+        :param high_surrogate:
+        :return:
+        """
+        if self._string[current_index:current_index + 2] != self.UNICODE_ESCAPE:
+            raise self._error("lept parse invalid unicode surrogate", current_index)
+        current_index += 2
+        low_surrogate = self._str2hex(current_index)
+        if 0xdfff >= low_surrogate >= 0xdc00:
+            # the formulae to compute unicode from surrogate pair
+            return 0x10000 + (high_surrogate - 0xd800) * 0x400 + (low_surrogate - 0xdc00), \
+                   current_index + 4
+        raise self._error("lept parse invalid unicode surrogate", current_index)
+
+    def _str2hex(self, current_index: int) -> int:
+        """
+        convert the four hexadecimal digits of a unicode escape to decimal
+        :param current_index: start position of hexadecimal string
+        :return:
+        """
+        if self.HEX4_RE.match(self._string, current_index) is None:
+            raise self._error("lept parse invalid unicode hex", current_index)
+        return int(self._decode(current_index, current_index + 4), 16)
+
+    def _parse_literal(self, current_index: int, literal: Union[str, bytes],
+                       return_value: Optional[bool]) -> tuple[Optional[bool], int]:
+        if self._string[current_index:current_index + len(literal)] == literal:
+            return return_value, current_index + len(literal)
+        raise self._error("lept parse invalid value", current_index)
+
+    def _parse_number(self, current_index: int) -> tuple[Any, int]:
+        string = self._string
+        match = self.NUMBER_RE.match(string, current_index)
+        if match is None:
+            raise self._error("lept parse invalid value", current_index)
+        end_index = match.end()
+        fraction, exponent = match.groups()
+        if exponent is None:
+            # a '.' or an exponent mark not followed by digits, e.g. "1." or "1e+"
+            next_element = string[end_index:end_index + 1]
+            if next_element in self.EXPONENT_MARKS or \
+                    (fraction is None and next_element == self.DECIMAL_POINT):
+                raise self._error("lept parse invalid value", current_index)
+        token = self._decode(current_index, end_index)
+        if fraction is None and exponent is None:
+            if self._parse_int is not None:
+                return self._parse_int(token), end_index
+            # fast path: integers this short are neither too big nor inexact as floats
+            if end_index - current_index <= 15:
+                return float(token), end_index
+        elif self._parse_float is not None:
+            return self._parse_float(token), end_index
+        result = float(token)
+        if isinf(result):
+            raise self._error("lept parse number too big", current_index)
+        return result, end_index
+
+
+class _BytesScanner(_Scanner):
+    """
+    _Scanner over utf-8 encoded json in bytes or a memory-mapped file.
+
+    The text is scanned in place; only string values, and number and hexadecimal
+    tokens, are decoded, which also validates the utf-8 encoding of strings.
+    """
+    QUOTE = b'"'
+    BACKSLASH = b'\\'
+    NEWLINE = b'\n'
+    BEGIN_OBJECT = b'{'
+    END_OBJECT = b'}'
+    BEGIN_ARRAY = b'['
+    END_ARRAY = b']'
+    VALUE_SEPARATOR = b','
+    UNICODE_ESCAPE = b'\\u'
+    UNICODE_ESCAPE_MARK = b'u'
+    DECIMAL_POINT = b'.'
+    EXPONENT_MARKS = (b'e', b'E')
+    LITERALS = {b'n': (b'null', None), b't': (b'true', True), b'f': (b'false', False)}
+    LITERAL_NULL = b'null'
+    ESCAPES = {mark.encode(): character for mark, character in ESCAPE_CHARACTER_MAPPING.items()}
+    SCALAR_EVENTS = {mark.encode(): event for mark, event in SCALAR_EVENTS.items()}
+    WHITESPACE_RE = re.compile(WHITESPACE_RE.pattern.encode())
+    STRING_CHUNK_RE = re.compile(STRING_CHUNK_RE.pattern.encode())
+    NUMBER_RE = re.compile(NUMBER_RE.pattern.encode())
+    HEX4_RE = re.compile(HEX4_RE.pattern.encode())
+    NAME_SEPARATOR_RE = re.compile(NAME_SEPARATOR_RE.pattern.encode())
+    NUMERIC_ARRAY_RE = re.compile(NUMERIC_ARRAY_RE.pattern.encode())
+    STRING_RE = re.compile(STRING_RE.pattern.encode())
+    SKIP_RE = re.compile(SKIP_RE.pattern.encode())
+
+    def _decode_lossy(self, start: int, end: int) -> str:
+        return str(self._string[start:end], 'utf-8', 'replace')
+
+    def _decode(self, start: int, end: int) -> str:
+        try:
+            return str(self._string[start:end], 'utf-8')
+        except UnicodeDecodeError as error:
+            raise self._error("lept parse invalid utf-8", start + error.start) from None
 
 
 if __name__ == '__main__':
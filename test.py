@@ -1,8 +1,30 @@
 #!/usr/bin/env python3
 # coding=utf-8
 
+import asyncio
+import copy
+import io
+import pickle
+import os
+import tempfile
 import unittest
-from leptjson import parse, LeptJsonParseError, stringify
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from enum import Enum, IntEnum
+from typing import Optional
+from unittest import mock
+
+import bench
+from leptjson import parse, LeptJsonParseError, stringify, LeptJsonStringifyError, iter_parse, \
+    IncrementalDecoder, iter_events, parse_lazy, load, iter_stringify, dump, register_encoder, Decoder, \
+    parse_many, parse_parallel, async_iter_parse, ParseStats, dumpb, loadb, CachedDecoder, \
+    compile_decoder, ObjectPairs, diff, apply_patch, merge_diff, apply_merge_patch, LeptJsonPatchError, \
+    ASYNC_SLICE_SIZE
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
 
 
 class LeptJsonTest(unittest.TestCase):
@@ -68,6 +90,33 @@ class LeptJsonTest(unittest.TestCase):
         self.assertEqual(1.7976931348623157e+308, parse("1.7976931348623157e+308"))
         self.assertEqual(-1.7976931348623157e+308, parse("-1.7976931348623157e+308"))
 
+    def test_parse_number_hooks(self):
+        self.assertEqual([123456789012345678, -1, 0, 1.5], parse("[123456789012345678, -1, 0, 1.5]",
+                                                                 parse_int=int))
+        self.assertIsInstance(parse("0", parse_int=int), int)
+        self.assertEqual([Decimal("1.5"), Decimal("1E+400"), 2.0],
+                         parse("[1.5, 1e400, 2]", parse_float=Decimal))
+        self.assertEqual(10 ** 400, parse("1" + "0" * 400, parse_int=int))
+        self.exception("1" + "0" * 400, "lept parse number too big")
+        self.exception("1.", "lept parse invalid value", parse_int=int)
+
+    def test_parse_numeric_arrays(self):
+        value = parse('{"a": [1, -2.5e1 ,\n3], "b": [[0.5], [], [1, "x"]]}', numeric_arrays=True)
+        self.assertEqual(array('d', [1, -25, 3]), value['a'])
+        self.assertEqual([array('d', [0.5]), [], [1.0, 'x']], value['b'])
+        self.assertEqual(array('d', [1, 2]), Decoder(numeric_arrays=True).parse(b'[1,2]'))
+        self.assertEqual([1, 2], parse('[1, 2]', parse_int=int, numeric_arrays=True))
+        json_string = '{"a":[1,2.5,-2.9999999999999999e-07],"b":[[1,2],[]]}'
+        self.assertEqual(json_string, stringify(parse(json_string, numeric_arrays=True)))
+        self.assertEqual('[[-1,2],[]]', stringify([array('i', [-1, 2]), array('d')]))
+        self.assertRaises(LeptJsonStringifyError, stringify, array('u', 'a'))
+        for json_string, msg in (("[1e309]", "lept parse number too big"),
+                                 ("[01]", "lept parse miss comma or square bracket"),
+                                 ("[1,]", "lept parse invalid value"), ("[[1]]", "lept parse max depth exceeded")):
+            with self.assertRaises(LeptJsonParseError) as context:
+                parse(json_string, max_depth=1, numeric_arrays=True)
+            self.assertEqual(msg, context.exception.msg)
+
     def test_parse_number_too_big(self):
         self.exception("1e309", "lept parse number too big")
         self.exception("-1e309", "lept parse number too big")
@@ -153,6 +202,47 @@ class LeptJsonTest(unittest.TestCase):
                 " } "
             ))
 
+    def test_parse_duplicate_keys(self):
+        json_string = '{"a": 1, "b": {"c": 2, "c": [3]}, "a": 4}'
+        self.assertEqual({'a': 4.0, 'b': {'c': [3.0]}}, parse(json_string))
+        self.assertEqual({'a': 1.0, 'b': {'c': 2.0}}, parse(json_string, duplicate_keys='first'))
+        collected = parse(json_string.encode('utf-8'), duplicate_keys='collect')
+        self.assertIsInstance(collected, ObjectPairs)
+        self.assertEqual([('a', 1.0), ('b', [('c', 2.0), ('c', [3.0])]), ('a', 4.0)], collected)
+        self.assertEqual([1.0, 4.0], collected.getall('a'))
+        self.assertEqual({'a': 1.0, 'b': 2.0}, parse('{"a": 1, "b": 2}', duplicate_keys='collect'))
+        self.assertEqual('{"a":1,"b":{"c":2,"c":[3]},"a":4}', stringify(collected))
+        self.assertEqual(collected, parse(stringify(collected), duplicate_keys='collect'))
+        self.assertEqual(parse(json_string), loadb(dumpb(collected)))
+        # selected from the built object the same as while parsing it
+        nested_string = '{"a": {"x": 1, "x": [2], "y": 3}}'
+        for selector, expected in (('a.*', [1.0, [2.0], 3.0]), ('a.x', [1.0, [2.0]]), ('a.x[0]', [2.0])):
+            for selectors in ([selector], ['a', selector]):
+                self.assertEqual(expected, parse(nested_string, select=selectors,
+                                                 duplicate_keys='collect')[selector])
+        self.exception(json_string, "lept parse duplicate key", duplicate_keys='error')
+        self.assertEqual({'a': {'a': 1.0}}, parse('{"a": {"a": 1}}', duplicate_keys='error'))
+        with self.assertRaises(LeptJsonParseError) as context:
+            parse('{"a": 1,\n "a": 2}', duplicate_keys='error')
+        self.assertEqual((2, 2), (context.exception.lineno, context.exception.colno))
+        self.assertRaises(ValueError, Decoder, duplicate_keys='merge')
+
+    def test_duplicate_keys_copied(self):
+        json_string = '{"a": 1, "a": {"b": [2]}}'
+        decoder = CachedDecoder(Decoder(duplicate_keys='collect'), frozen=True)
+        frozen = decoder.parse(json_string)
+        self.assertIsInstance(frozen, ObjectPairs)
+        self.assertEqual(parse(json_string, duplicate_keys='collect'), frozen)
+        self.assertEqual('{"a":1,"a":{"b":[2]}}', stringify(frozen))
+        self.assertRaises(TypeError, frozen.append, ('c', 3))
+        self.assertRaises(TypeError, frozen[1][1].__setitem__, 'b', 3)
+        self.assertRaises(TypeError, frozen[1][1]['b'].append, 3)
+        self.assertEqual(frozen, pickle.loads(pickle.dumps(frozen)))
+        document = {'x': parse(json_string, duplicate_keys='collect')}
+        apply_patch(document, [{'op': 'copy', 'from': '/x', 'path': '/y'}])
+        self.assertEqual('{"x":{"a":1,"a":{"b":[2]}},"y":{"a":1,"a":{"b":[2]}}}', stringify(document))
+        self.assertIsNot(document['x'][1][1], document['y'][1][1])
+
     def test_parse_miss_key(self):
         self.exception("{:1,", "lept parse miss key")
         self.exception("{1:1,", "lept parse miss key")
@@ -173,6 +263,31 @@ class LeptJsonTest(unittest.TestCase):
         self.exception("{\"a\":1 \"b\"", "lept parse miss comma or curly bracket")
         self.exception("{\"a\":{}", "lept parse miss comma or curly bracket")
 
+    def test_parse_max_depth(self):
+        nested = '[{"a":' * 2000 + '1' + '}]' * 2000
+        result = parse(nested)
+        for _ in range(2000):
+            result = result[0]['a']
+        self.assertEqual(1.0, result)
+        self.assertEqual([[[]]], parse("[[[]]]", max_depth=3))
+        self.exception("[[[]]]", "lept parse max depth exceeded", max_depth=2)
+        self.exception("[[{}]]", "lept parse max depth exceeded", max_depth=2)
+        self.exception("[" * 100000, "lept parse max depth exceeded")
+        with self.assertRaises(LeptJsonParseError) as context:
+            list(iter_events("[[[]]]", max_depth=2))
+        self.assertEqual(context.exception.msg, "lept parse max depth exceeded")
+
+    def test_stringify_max_depth(self):
+        nested = []
+        for _ in range(5000):
+            nested = [nested]
+        self.assertEqual('[' * 5001 + ']' * 5001, stringify(nested))
+        self.assertEqual('[[{}]]', stringify([[{}]], max_depth=3))
+        self.assertRaises(LeptJsonStringifyError, stringify, [[{}]], max_depth=2)
+        cyclic = {}
+        cyclic['a'] = [cyclic]
+        self.assertRaises(LeptJsonStringifyError, stringify, cyclic)
+
     def test_stringify_number(self):
         self.roundtrip("0")
         self.roundtrip("-0")
@@ -194,6 +309,34 @@ class LeptJsonTest(unittest.TestCase):
         self.roundtrip("1.7976931348623157e+308")  # Max double
         self.roundtrip("-1.7976931348623157e+308")
 
+    def test_stringify_int(self):
+        self.assertEqual("123456789012345678", stringify(123456789012345678))
+        self.assertEqual("[-1,0,1e+20]", stringify([-1, 0, 1e20]))
+
+    def test_iter_stringify(self):
+        value = load(os.path.join(DATA_DIR, 'twitter.json'))
+        text = stringify(value)
+        chunks = list(iter_stringify(value, chunk_size=4096))
+        self.assertEqual(text, ''.join(chunks))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) >= 4096 for chunk in chunks[:-1]))
+        self.assertEqual(['null'], list(iter_stringify(None)))
+        self.assertEqual(['[[],{}]'], list(iter_stringify([[], {}])))
+        nested = []
+        for _ in range(5000):
+            nested = [nested, 'a']
+        self.assertEqual(stringify(nested), ''.join(iter_stringify(nested, chunk_size=1)))
+        self.assertRaises(LeptJsonStringifyError, list, iter_stringify([[{}]], max_depth=2))
+
+    def test_dump(self):
+        value = {'a': [1, 'ü', {'b': None}], 'c': True}
+        with io.StringIO() as fp:
+            dump(value, fp, chunk_size=1)
+            self.assertEqual(stringify(value), fp.getvalue())
+        with io.BytesIO() as fp:
+            dump(value, fp)
+            self.assertEqual(stringify(value).encode('utf-8'), fp.getvalue())
+
     def test_stringify_string(self):
         self.roundtrip("\"\"")
         self.roundtrip("\"Hello\"")
@@ -202,6 +345,49 @@ class LeptJsonTest(unittest.TestCase):
         self.roundtrip("\"Hello\\u000f\\u0000World\"")
         # self.roundtrip("\"\\u0009\"")
 
+    def test_stringify_string_escape(self):
+        self.assertEqual('"\u00e9\u20ac\U0001f600"', stringify("\u00e9\u20ac\U0001f600"))
+        self.assertEqual('"\\ud800x\\udfff"', stringify("\ud800x\udfff"))
+        self.assertEqual('"\\u00e9\\u20ac\\ud83d\\ude00\\u007f"',
+                         stringify("\u00e9\u20ac\U0001f600\x7f", ensure_ascii=True))
+        self.assertEqual('{"\\u00e9":"\\n"}', stringify({"\u00e9": "\n"}, ensure_ascii=True))
+        self.assertEqual("\U0001f600", parse(stringify("\U0001f600", ensure_ascii=True)))
+
+    def test_stringify_custom(self):
+        @dataclass
+        class Point:
+            x: int
+            y: list
+
+        class Slotted:
+            __slots__ = ('a', '__b', 'unset')
+
+            def __init__(self):
+                self.a = 1
+                self.__b = Point(2, [])
+
+        class Color(Enum):
+            RED = 'red'
+
+        class Size(IntEnum):
+            BIG = 2
+
+        self.assertEqual('{"x":1,"y":[2]}', stringify(Point(1, [2])))
+        self.assertEqual('{"a":1,"__b":{"x":2,"y":[]}}', stringify(Slotted()))
+        self.assertEqual('[2]', stringify([Size.BIG]))
+        self.assertRaises(LeptJsonStringifyError, stringify, Color.RED)
+        self.assertRaises(LeptJsonStringifyError, stringify, date(2020, 1, 2), default=lambda obj: obj)
+        self.assertEqual('{"d":"2020-01-02"}', stringify({'d': date(2020, 1, 2)}, default=date.isoformat))
+        self.assertEqual('"2020-01-02"', stringify(Color.RED, default=lambda obj: date(2020, 1, 2)
+                                                   if isinstance(obj, Color) else obj.isoformat()))
+        with self.assertRaises(LeptJsonStringifyError):
+            stringify([Color.RED], default=lambda obj: date(2020, 1, 2) if isinstance(obj, Color) else Color.RED)
+        register_encoder(Color, lambda color: color.value)
+        self.assertEqual('{"c":"red"}', stringify({'c': Color.RED}))
+        self.assertEqual('["red"]', ''.join(iter_stringify([Color.RED])))
+        register_encoder(Size, lambda size: size.name)
+        self.assertEqual('"BIG"', stringify(Size.BIG))
+
     def test_stringify_array(self):
         self.roundtrip("[]")
         self.roundtrip("[null,false,true,123,\"abc\",[1,2,3]]")
@@ -216,10 +402,585 @@ class LeptJsonTest(unittest.TestCase):
         self.roundtrip("false")
         self.roundtrip("true")
 
-    def exception(self, json_string, msg):
+    def test_iter_parse(self):
+        path = os.path.join(DATA_DIR, 'one-json-per-line.txt')
+        with open(path, encoding='utf-8') as file:
+            expected = [parse(line) for line in file if line.strip()]
+        self.assertEqual(expected, list(iter_parse(path)))
+        self.assertEqual(expected, list(iter_parse(path, chunk_size=7)))
+        with open(path, encoding='utf-8') as file:
+            self.assertEqual(expected, list(iter_parse(file, chunk_size=7)))
+        self.assertEqual([1.0, [], 'a'], list(iter_parse(io.BytesIO(b'1\n\n []\r\n"a"'))))
+
+    def test_parse_many(self):
+        path = os.path.join(DATA_DIR, 'one-json-per-line.txt')
+        expected = list(iter_parse(path))
+        self.assertEqual(expected, list(parse_many(path, workers=1, shard_size=1000)))
+        self.assertEqual(expected, list(parse_many(path, workers=2, shard_size=1000)))
+        unordered = list(parse_many(path, workers=2, ordered=False, shard_size=1000))
+        self.assertEqual(sorted(map(repr, expected)), sorted(map(repr, unordered)))
+        with open(path, 'rb') as file:
+            self.assertEqual(expected, list(parse_many(file, workers=2, shard_size=1000)))
+        self.assertEqual([1.0, 'a'], list(parse_many(['1', '', '"a"'], workers=1)))
+
+    def test_parse_many_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'lines.txt')
+            with open(path, 'wb') as file:
+                file.write(b'[1]\n' * 100 + b'[1\n' + b'[2]\n')
+            for workers in (1, 2):
+                with self.assertRaises(LeptJsonParseError) as context:
+                    list(parse_many(path, workers=workers, shard_size=16))
+                self.assertEqual(context.exception.msg, "lept parse miss comma or square bracket")
+                self.assertEqual(context.exception.lineno, 101)
+                self.assertEqual(context.exception.byte_offset, 400)
+            self.assertEqual([[1.0]] * 100 + [[2.0]],
+                             list(parse_many(path, workers=2, shard_size=16, skip_errors=True)))
+            open(path, 'wb').close()
+            self.assertEqual([], list(parse_many(path, workers=2)))
+        with self.assertRaises(LeptJsonParseError) as context:
+            list(parse_many(['1', '[', '2'], workers=2, shard_size=1))
+        self.assertEqual(context.exception.lineno, 2)
+
+    def test_parse_parallel(self):
+        value = load(os.path.join(DATA_DIR, 'twitter.json'))
+        text = stringify(value['statuses'])
+        self.assertEqual(value['statuses'], parse_parallel(text, workers=2, shard_size=10000))
+        self.assertEqual(value['statuses'], parse_parallel(text.encode('utf-8'), workers=2, shard_size=10000))
+        self.assertEqual(value, parse_parallel(stringify(value), workers=2))
+        self.assertEqual([{}, [1.0], 2.0, {'a': '}'}], parse_parallel(' [{} ,[1],2,{"a":"}"}] ', workers=2, shard_size=1))
+        for json_string in ('[{},]', '[{},{]', '[{}}', '[{},{}] x', '[{},{}', '[{},["]"}]'):
+            with self.assertRaises(LeptJsonParseError) as expected:
+                parse(json_string)
+            with self.assertRaises(LeptJsonParseError) as context:
+                parse_parallel(json_string, workers=2, shard_size=1)
+            self.assertEqual(expected.exception.msg, context.exception.msg)
+
+    def test_async_iter_parse(self):
+        with open(os.path.join(DATA_DIR, 'twitter.json'), 'rb') as file:
+            text = file.read()
+        expected = parse(text)
+
+        async def chunks(data, size):
+            for start in range(0, len(data), size):
+                yield data[start:start + size]
+
+        async def collect(reader, **kwargs):
+            return [value async for value in async_iter_parse(reader, **kwargs)]
+
+        async def from_stream_reader(data):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return await collect(reader, chunk_size=1000)
+
+        # length of every piece of text fed to the decoder
+        fed = []
+        feed = IncrementalDecoder.feed
+
+        def spy(decoder, chunk):
+            fed.append(len(chunk))
+            return feed(decoder, chunk)
+
+        async def with_ticker(size):
+            # number of pieces fed so far, at every run of another task
+            ticks = []
+            done = False
+
+            async def ticker():
+                while not done:
+                    ticks.append(len(fed))
+                    await asyncio.sleep(0)
+
+            task = asyncio.create_task(ticker())
+            values = await collect(chunks(text, size))
+            done = True
+            await task
+            return ticks, values
+
+        self.assertEqual([expected], asyncio.run(from_stream_reader(text)))
+        self.assertEqual([expected, 1.0, [2.0]], asyncio.run(from_stream_reader(text + b'\n1 \n[2]')))
+        self.assertEqual([{'id': 505874924095815681}], asyncio.run(
+            collect(chunks(b'{"id": 505874924095815681}', 5), parse_int=int)))
+        with ThreadPoolExecutor(1) as executor:
+            self.assertEqual([expected], asyncio.run(collect(chunks(text, 4096), executor=executor)))
+        # a chunk holding the whole document is still fed a slice at a time,
+        # and the other task runs after every slice
+        for size in (4096, len(text)):
+            fed.clear()
+            with mock.patch.object(IncrementalDecoder, 'feed', spy):
+                ticks, values = asyncio.run(with_ticker(size))
+            self.assertEqual([expected], values)
+            self.assertEqual(len(text), sum(fed))
+            self.assertLessEqual(max(fed), ASYNC_SLICE_SIZE)
+            self.assertEqual(list(range(1, len(fed) + 1)), sorted(set(ticks)))
+        with self.assertRaises(LeptJsonParseError) as context:
+            asyncio.run(collect(chunks(b'[1] [2', 2)))
+        self.assertEqual(context.exception.msg, "lept parse miss comma or square bracket")
+
+    def test_bench(self):
+        for value in (bench.synthetic_strings(50), bench.synthetic_numbers(50), bench.synthetic_nested(5)):
+            self.assertEqual(value, parse(stringify(value), parse_int=int))
+        baseline = {'benchmarks': {'twitter': {'parse_mb_s': 10.0, 'json_parse_mb_s': 100.0,
+                                               'parse_peak_bytes': 1000, 'size_mb': 1.0}}}
+        results = {'benchmarks': {'twitter': {'parse_mb_s': 8.0, 'json_parse_mb_s': 50.0,
+                                              'parse_peak_bytes': 1050, 'size_mb': 2.0},
+                                  'ndjson': {'latency_p50_us': 10.0}}}
+        self.assertEqual(['twitter.parse_mb_s: 10 -> 8 (20.0% worse)'], bench.compare(baseline, results))
+        self.assertEqual([], bench.compare(baseline, results, threshold=0.25))
+
+    def test_parse_stats(self):
+        stats = ParseStats()
+        self.assertEqual({'é': [1.0, True, '\n', [{}]]}, parse('{"é": [1, true, "\\n", [{}]]}', stats=stats))
+        self.assertEqual(1, stats.documents)
+        self.assertEqual(29, stats.bytes)
+        self.assertEqual((2, 2, 4), (stats.objects, stats.arrays, stats.max_depth))
+        self.assertEqual({'key': 1, 'number': 1, 'literal': 1, 'string': 1, 'escape': 1},
+                         {production: stats.calls[production] for production in
+                          ('key', 'number', 'literal', 'string', 'escape')})
+        self.assertAlmostEqual(stats.time, sum(stats.times.values()))
+        with self.assertRaises(LeptJsonParseError):
+            parse('[1, 2', stats=stats)
+        self.assertEqual(2, stats.documents)
+        self.assertEqual(3, stats.calls['number'])
+        stats = ParseStats()
+        self.assertEqual(1000, sum(1 for _ in Decoder(stats=stats).iter_parse(
+            os.path.join(DATA_DIR, 'one-json-per-line.txt'))))
+        self.assertEqual(1000, stats.documents)
+        self.assertEqual(os.path.getsize(os.path.join(DATA_DIR, 'one-json-per-line.txt')),
+                         stats.bytes + 1000)
+        self.assertEqual({'a': [1.0]}, parse(b'{"a": 1, "b": 2}', select=['a'], stats=stats))
+        self.assertIn('documents=1001', repr(stats))
+
+    def test_parse_error_position(self):
+        for json_string, pos, lineno, colno, excerpt in (
+                ('[1, 2}', 5, 1, 6, '[1, 2}'),
+                ('[1,\n 2,\n "\u00e9" x]', 13, 3, 6, ' "\u00e9" x]'),
+                (b'[1,\n 2,\n "\xc3\xa9" x]', 14, 3, 6, ' "\u00e9" x]'),
+                (b'["\xff"]', 2, 1, 3, '["\ufffd"]'),
+                ('{"a":' + ' ' * 50 + 'x}', 55, 1, 56, ' ' * 20 + 'x}')):
+            with self.assertRaises(LeptJsonParseError) as context:
+                parse(json_string)
+            error = context.exception
+            self.assertEqual((pos, lineno, colno, excerpt), (error.pos, error.lineno, error.colno, error.excerpt))
+        with self.assertRaises(LeptJsonParseError) as context:
+            parse_parallel('[{}, {}, {"a": tru}]', workers=2, shard_size=1)
+        self.assertEqual((15, 1, 16), (context.exception.pos, context.exception.lineno, context.exception.colno))
+        with self.assertRaises(LeptJsonParseError) as context:
+            list(iter_parse(io.BytesIO(b'[1]\n\n{"a" 1}\n')))
+        error = context.exception
+        self.assertEqual((3, 5, 5, 4), (error.lineno, error.byte_offset, error.colno, error.pos))
+        self.assertEqual('lept parse miss colon: line 3 column 5 (byte offset 5) near \'{"a" 1}\'', str(error))
+
+    def test_dumpb(self):
+        value = load(os.path.join(DATA_DIR, 'twitter.json'))
+        for key_dictionary in (True, False):
+            data = dumpb(value, key_dictionary)
+            self.assertLess(len(data), os.path.getsize(os.path.join(DATA_DIR, 'twitter.json')) * 2 // 3)
+            self.assertEqual(value, loadb(data))
+        scalars = [None, True, False, 0.0, -0.0, 1.0, -1.0, 2.0 ** 60, -2.0 ** 47, 0.1, 1e300,
+                   float('inf'), 0, -1, 2 ** 100, -2 ** 100, '', 'é\U0001f600', '\udc00', [], {}, [[{}]]]
+        loaded = loadb(bytearray(dumpb({'k': scalars, '': (1.5, 'a' * 300)})))
+        self.assertEqual({'k': scalars, '': [1.5, 'a' * 300]}, loaded)
+        self.assertEqual([type(scalar) for scalar in scalars], [type(scalar) for scalar in loaded['k']])
+        self.assertEqual('-0.0', repr(loaded['k'][4]))
+        self.assertEqual(parse('[1, 2.5, "x", {"a": null}]'), loadb(memoryview(dumpb(parse('[1, 2.5, "x", {"a": null}]')))))
+        self.assertEqual([[1.0, 2.5], [3]], loadb(dumpb([array('d', [1, 2.5]), array('q', [3])])))
+
+    def test_dumpb_error(self):
+        self.assertRaises(LeptJsonStringifyError, dumpb, {1: 2})
+        self.assertRaises(LeptJsonStringifyError, dumpb, {1, 2})
+        self.assertRaises(LeptJsonStringifyError, dumpb, [[{}]], max_depth=2)
+        data = dumpb({'a': [1.0, 'b']})
+        for invalid, msg in ((b'', "lept loadb invalid header"), (b'{"a": 1}', "lept loadb invalid header"),
+                             (data[:-1], "lept loadb invalid data"), (data + b'\x00', "lept loadb invalid data"),
+                             (data[:5] + b'\x63', "lept loadb invalid data")):
+            with self.assertRaises(LeptJsonParseError) as context:
+                loadb(invalid)
+            self.assertEqual(msg, context.exception.msg)
+
+    def test_cached_decoder(self):
+        with open(os.path.join(DATA_DIR, 'twitter.json'), 'rb') as file:
+            text = file.read()
+        decoder = CachedDecoder()
+        result = decoder.parse(text)
+        self.assertEqual(parse(text), result)
+        self.assertIs(result, decoder.parse(bytearray(text)))
+        self.assertEqual((1, 1, 0, 1), (decoder.hits, decoder.misses, decoder.evictions, len(decoder)))
+        decoder = CachedDecoder(max_entries=2)
+        for json_string in ('1', '2', '1', '3', '2'):
+            decoder.parse(json_string)
+        self.assertEqual((1, 4, 2, 2), (decoder.hits, decoder.misses, decoder.evictions, len(decoder)))
+        decoder = CachedDecoder(max_bytes=len(text))
+        decoder.parse(text)
+        decoder.parse('[1]')
+        decoder.parse('[1]')
+        self.assertEqual((1, 2, 1), (len(decoder), decoder.misses, decoder.hits))
+        self.assertLessEqual(decoder.bytes, len(text))
+        decoder.clear()
+        self.assertEqual((0, 0), (len(decoder), decoder.bytes))
+
+    def test_cached_decoder_frozen(self):
+        decoder = CachedDecoder(frozen=True)
+        json_string = '{"a": [1, {"b": [[]]}], "c": "d"}'
+        result = decoder.parse(json_string)
+        self.assertEqual(parse(json_string), result)
+        self.assertEqual(stringify(parse(json_string)), stringify(result))
+        self.assertRaises(TypeError, result.__setitem__, 'c', 1)
+        self.assertRaises(TypeError, result.update, {})
+        self.assertRaises(TypeError, result['a'].append, 1)
+        self.assertRaises(TypeError, result['a'][1]['b'][0].extend, [1])
+        with self.assertRaises(TypeError):
+            result['a'] += [1]
+        self.assertEqual(parse(json_string), decoder.parse(json_string))
+        self.assertEqual(result, copy.deepcopy(result))
+        self.assertEqual(result, pickle.loads(pickle.dumps(result)))
+        self.assertIs(decoder.parse(json_string), result)
+        decoder = CachedDecoder(Decoder(numeric_arrays=True), frozen=True)
+        result = decoder.parse('[[1, 2], {"a": [3]}]')
+        self.assertEqual([array('d', [1, 2]), {'a': array('d', [3])}], result)
+        self.assertEqual('[[1,2],{"a":[3]}]', stringify(result))
+        for numbers in (result[0], result[1]['a']):
+            self.assertRaises(TypeError, numbers.__setitem__, 0, 5.0)
+            self.assertRaises(TypeError, numbers.append, 5.0)
+            self.assertRaises(TypeError, numbers.frombytes, bytes(8))
+            with self.assertRaises(TypeError):
+                numbers += array('d', [5])
+        self.assertEqual(result, pickle.loads(pickle.dumps(result)))
+        self.assertEqual([array('d', [1, 2]), {'a': array('d', [3])}], decoder.parse('[[1, 2], {"a": [3]}]'))
+
+    def test_compile_decoder(self):
+        @dataclass
+        class Point:
+            x: float
+            y: float
+
+        @dataclass
+        class Record:
+            id: int
+            name: str
+            tags: list[str]
+            origin: Point
+            note: Optional[str] = None
+
+        class Slotted:
+            __slots__ = ('a', 'b')
+            a: bool
+            b: dict[str, int]
+
+        decoder = compile_decoder(Record)
+        expected = Record(12345678901234567890, 'a', ['x'], Point(1.0, 2.5))
+        for json_string in ('{"id": 12345678901234567890, "name": "a", "tags": ["x"], "origin": {"x": 1, "y": 2.5}}',
+                            b'{"origin":{"y":2.5,"x":1},"tags":["x"],"extra":[{}],"name":"a","id":12345678901234567890}',
+                            '{"id": 12345678901234567890, "name": "\\u0061", "tags": ["x"], "origin": {"x": 1, "y": 25e-1}}'):
+            self.assertEqual(expected, decoder.parse(json_string))
+        self.assertEqual('b', decoder.parse('{"id": 1.0, "name": "", "tags": [], "origin": {"x": 0, "y": 0}, '
+                                            '"note": "b"}').note)
+        slotted = compile_decoder(Slotted).parse('{"a": true, "b": {"c": 1}}')
+        self.assertEqual((True, {'c': 1}), (slotted.a, slotted.b))
+        for json_string, msg in (('{"id": 1.5}', "lept parse schema mismatch: expect integer"),
+                                 ('{"id": 1, "name": "a", "tags": [1], "origin": {"x": 1, "y": 2}}',
+                                  "lept parse schema mismatch: expect string"),
+                                 ('{"id": 1, "name": "a", "tags": []}', "lept parse schema mismatch: missing keys "
+                                                                        "['origin']"),
+                                 ('[]', "lept parse schema mismatch: expect object"),
+                                 ('{"id": 1', "lept parse miss comma or curly bracket")):
+            with self.assertRaises(LeptJsonParseError) as context:
+                decoder.parse(json_string)
+            self.assertEqual(msg, context.exception.msg)
+        # keys which need escapes are parsed, never matched as written
+        decoder = compile_decoder({'type': 'object', 'properties': {'a\\b': {'type': 'number'},
+                                                                  'a"b': {'type': 'number'}}})
+        for json_string in ('{"a\\b": 1}', '{"a\\u0008": 1}', '{"a\\\\b": 1, "a\\"b": 2}'):
+            self.assertEqual(parse(json_string), decoder.parse(json_string))
+        for json_string in ('{"a"b": 1}', '{"a\x08": 1}'):
+            with self.assertRaises(LeptJsonParseError) as context:
+                decoder.parse(json_string)
+            with self.assertRaises(LeptJsonParseError) as parse_context:
+                parse(json_string)
+            self.assertEqual(parse_context.exception.msg, context.exception.msg)
+        self.assertRaises(ValueError, compile_decoder, set)
+
+    def test_compile_decoder_json_schema(self):
+        decoder = compile_decoder({'type': 'array', 'items': {
+            'type': 'object', 'properties': {'id': {'type': 'integer'}, 'name': {'type': ['string', 'null']},
+                                             'tags': {'type': 'array'}},
+            'required': ['id'], 'additionalProperties': False}})
+        for json_string in ('[{"id": 1, "name": "a", "tags": [true, {}]}, {"id": 2, "name": null}]',
+                            '[ {"name": "a", "tags": [true, {}], "id": 1.0}, {"id": 2, "name": null} ]'):
+            self.assertEqual(parse(json_string), decoder.parse(json_string))
+        for json_string in ('[{"id": 1, "other": 1}]', '[{"id": 1, "name": 2}]', '[{"name": "a"}]', '[{"id": 0.5}]'):
+            self.assertRaises(LeptJsonParseError, decoder.parse, json_string)
+        with open(os.path.join(DATA_DIR, 'one-json-per-line.txt'), 'rb') as file:
+            lines = [line for line in file if line.strip()]
+        decoder = compile_decoder({'type': 'object', 'properties': {'Object': {'type': 'object'}}})
+        self.assertEqual([parse(line) for line in lines], [decoder.parse(line) for line in lines])
+        self.assertRaises(ValueError, compile_decoder, {'type': ['string', 'number']})
+
+    def test_diff(self):
+        source = source_document = load(os.path.join(DATA_DIR, 'twitter.json'))
+        target = copy.deepcopy(source)
+        target['statuses'][3]['user']['name'] = 'a/b~c'
+        target['statuses'][5]['entities'] = {'tags': [True]}
+        del target['statuses'][0]
+        target['statuses'].append(1)
+        target['search_metadata'].pop('count')
+        target['new'] = None
+        patch = diff(source, target)
+        self.assertEqual(target, apply_patch(copy.deepcopy(source), parse(stringify(patch))))
+        self.assertIn({'op': 'replace', 'path': '/statuses/2/user/name', 'value': 'a/b~c'}, patch)
+        self.assertEqual([], diff(source, source))
+        self.assertEqual([], diff(source, copy.deepcopy(source)))
+        self.assertEqual([{'op': 'replace', 'path': '', 'value': 1}], diff(True, 1))
+        self.assertEqual([{'op': 'replace', 'path': '/0', 'value': True}], diff([1], [True]))
+        for source, target in (([1, 2, 3], [0, 1, 2, 3]), ([1, 2, 3], [1, 3]), ([[1, 2], 3], [[2], 4, 5]),
+                               ({'a~/': 1}, {'a~/': [1]}), ([], {}), ([1, [2], 3, 4], [0, 1, [2, 5], 4, 6]),
+                               (list(range(300)), list(range(300, 0, -1)))):
+            self.assertEqual(target, apply_patch(copy.deepcopy(source), diff(source, target)))
+        target = copy.deepcopy(source_document)
+        target['statuses'].insert(0, {'id': 1})
+        target['statuses'][-1]['id'] = 2
+        patch = diff(source_document, target)
+        self.assertEqual([{'op': 'add', 'path': '/statuses/0', 'value': {'id': 1}},
+                          {'op': 'replace', 'path': f"/statuses/{len(target['statuses']) - 1}/id", 'value': 2}], patch)
+        self.assertEqual(target, apply_patch(copy.deepcopy(source_document), patch))
+
+    def test_apply_patch(self):
+        document = {'foo': ['bar', 'baz'], '': 0, 'a/b': 1, 'm~n': 8, 'k"l': 6}
+        patch = [{'op': 'test', 'path': '/foo/1', 'value': 'baz'}, {'op': 'test', 'path': '/', 'value': 0},
+                 {'op': 'test', 'path': '/a~1b', 'value': 1}, {'op': 'test', 'path': '/m~0n', 'value': 8},
+                 {'op': 'add', 'path': '/foo/1', 'value': 'qux'}, {'op': 'add', 'path': '/foo/-', 'value': 'x'},
+                 {'op': 'remove', 'path': '/k"l'}, {'op': 'replace', 'path': '/', 'value': [1]},
+                 {'op': 'move', 'from': '/foo/0', 'path': '/moved'}, {'op': 'copy', 'from': '/', 'path': '/c'}]
+        result = apply_patch(document, patch)
+        self.assertIs(document, result)
+        self.assertEqual({'foo': ['qux', 'baz', 'x'], '': [1], 'a/b': 1, 'm~n': 8, 'moved': 'bar', 'c': [1]}, result)
+        self.assertIsNot(result[''], result['c'])
+        self.assertEqual({'a': 1}, apply_patch([], [{'op': 'add', 'path': '', 'value': {'a': 1}}]))
+        for patch, msg in (([{'op': 'test', 'path': '/a', 'value': 1}], "lept patch test failed"),
+                           ([{'op': 'test', 'path': '/a', 'value': True}], "lept patch test failed"),
+                           ([{'op': 'remove', 'path': '/b'}], "lept patch path not found"),
+                           ([{'op': 'add', 'path': '/b/c', 'value': 1}], "lept patch path not found"),
+                           ([{'op': 'add', 'path': '/a/2', 'value': 1}], "lept patch path not found"),
+                           ([{'op': 'replace', 'path': '/a/0/x', 'value': 1}], "lept patch path not found"),
+                           ([{'op': 'add', 'path': '/a/01', 'value': 1}], "lept patch path not found"),
+                           ([{'op': 'add', 'path': 'a', 'value': 1}], "lept patch invalid pointer"),
+                           ([{'op': 'add', 'path': '/~2', 'value': 1}], "lept patch invalid pointer"),
+                           ([{'op': 'add', 'path': '/a'}], "lept patch invalid operation"),
+                           ([{'op': 'move', 'from': '/a', 'path': '/a/0'}], "lept patch invalid operation"),
+                           ([{'op': 'merge', 'path': '/a', 'value': 1}], "lept patch invalid operation")):
+            with self.assertRaises(LeptJsonPatchError) as context:
+                apply_patch({'a': [2]}, [{'op': 'test', 'path': '/a/0', 'value': 2}] + patch)
+            self.assertEqual((msg, 1), (context.exception.msg, context.exception.index))
+        error = pickle.loads(pickle.dumps(context.exception))
+        self.assertEqual(("lept patch invalid operation", 1), (error.msg, error.index))
+
+    def test_merge_patch(self):
+        document = {'title': 'Goodbye!', 'author': {'givenName': 'John', 'familyName': 'Doe'},
+                    'tags': ['example', 'sample'], 'content': 'This will be unchanged'}
+        target = {'title': 'Hello!', 'author': {'givenName': 'John'}, 'tags': ['example'],
+                  'content': 'This will be unchanged', 'phoneNumber': '+01-123-456-7890'}
+        patch = merge_diff(document, target)
+        self.assertEqual({'title': 'Hello!', 'phoneNumber': '+01-123-456-7890', 'author': {'familyName': None},
+                          'tags': ['example']}, patch)
+        self.assertEqual(target, apply_merge_patch(document, patch))
+        self.assertEqual({}, merge_diff(target, copy.deepcopy(target)))
+        self.assertEqual({'a': {'b': 'c'}}, apply_merge_patch({'a': {'b': 'c'}}, {'a': {'b': 'c'}}))
+        self.assertEqual({'a': {'bb': {}}}, apply_merge_patch({}, {'a': {'bb': {'ccc': None}}}))
+        self.assertEqual(['c'], apply_merge_patch({'a': 'b'}, ['c']))
+        self.assertEqual({'a': 'c'}, apply_merge_patch(['a'], {'a': 'c'}))
+        self.assertEqual([1], merge_diff({'a': 1}, [1]))
+
+    def test_decoder(self):
+        decoder = Decoder(parse_int=int)
+        first = decoder.parse('{"id": 1, "na\\u006de": "a"}')
+        second = decoder.parse(b'{"id": 2, "name": "b"}')
+        self.assertEqual({'id': 1, 'name': 'a'}, first)
+        self.assertEqual({'id': 2, 'name': 'b'}, second)
+        third = decoder.parse('{"id": 3}')
+        self.assertIs(next(iter(first)), next(iter(third)))
+        self.assertIs(next(iter(second)), next(iter(decoder.parse(b'{"id": 4}'))))
+        records = list(iter_parse(os.path.join(DATA_DIR, 'one-json-per-line.txt')))
+        self.assertIs(next(iter(records[0])), next(iter(records[-1])))
+        self.assertEqual(parse(b'{"id":[{"id":1}]}'), Decoder(key_cache_size=0).parse(b'{"id":[{"id":1}]}'))
+        self.assertEqual(load(os.path.join(DATA_DIR, 'twitter.json')),
+                         Decoder().load(os.path.join(DATA_DIR, 'twitter.json')))
+
+    def test_iter_parse_error(self):
+        source = b'[1]\n{"a":\xc3\xa9}\n[2]\n'
+        with self.assertRaises(LeptJsonParseError) as context:
+            list(iter_parse(io.BytesIO(source)))
+        self.assertEqual(context.exception.msg, "lept parse invalid value")
+        self.assertEqual(context.exception.lineno, 2)
+        self.assertEqual(context.exception.byte_offset, 4)
+        self.assertEqual([[1.0], [2.0]], list(iter_parse(io.BytesIO(source), skip_errors=True)))
+        source = '["é"]\r\n' * 2 + '[x]'
+        for file, byte_offset in ((io.BytesIO(source.encode('utf-8')), 16),
+                                  (io.TextIOWrapper(io.BytesIO(source.encode('utf-8')), encoding='utf-8'), None)):
+            with self.assertRaises(LeptJsonParseError) as context:
+                list(iter_parse(file, chunk_size=3))
+            self.assertEqual((3, byte_offset), (context.exception.lineno, context.exception.byte_offset))
+        with self.assertRaises(LeptJsonParseError) as context:
+            list(iter_parse(io.BytesIO(b'"\xff"')))
+        self.assertEqual(context.exception.msg, "lept parse invalid utf-8")
+
+    def test_incremental_decoder(self):
+        json_string = '[1.5e3, "\\uD834\\uDD1E", {"k": [true, null, "a\\\\b"]}, 12]'
+        for split in range(len(json_string) + 1):
+            decoder = IncrementalDecoder()
+            values = decoder.feed(json_string[:split]) + decoder.feed(json_string[split:])
+            self.assertEqual([parse(json_string)], values + decoder.close())
+        decoder = IncrementalDecoder()
+        self.assertEqual([], decoder.feed(b'"\xf0\x9d'))
+        self.assertEqual([b"\xF0\x9D\x84\x9E".decode('utf8')], decoder.feed(b'\x84\x9e"'))
+        decoder = IncrementalDecoder()
+        self.assertEqual([], decoder.feed('-12'))
+        self.assertEqual([-12.5], decoder.feed('.5') + decoder.close())
+        # the hooks get whole numbers, however the chunks cut them
+        json_string = '{"id": 505874924095815681, "ids": [505874924095815682], "x": 1.10}'
+        expected = parse(json_string, parse_int=int, parse_float=Decimal)
+        for size in (1, 3, 7):
+            decoder = IncrementalDecoder(parse_float=Decimal, parse_int=int)
+            values = []
+            for start in range(0, len(json_string), size):
+                values += decoder.feed(json_string[start:start + size].encode('utf-8'))
+            self.assertEqual([expected], values + decoder.close())
+        self.assertEqual({'id': 505874924095815681, 'ids': [505874924095815682], 'x': Decimal('1.10')},
+                         expected)
+        decoder = IncrementalDecoder(multiple=True)
+        self.assertEqual([1.0, [2.0], {'a': 3.0}], decoder.feed('1 [2]\n{"a":3}\n"x'))
+        self.assertEqual(['x'], decoder.feed('"') + decoder.close())
+        decoder = IncrementalDecoder()
+        for chunk in ('{"k', 'ey" ', ' : "a', '\\', '"b', ' c', '", "n": -', '1'):
+            self.assertEqual([], decoder.feed(chunk))
+        self.assertEqual([{'key': 'a"b c', 'n': -1.0}], decoder.feed('}') + decoder.close())
+
+    def test_incremental_decoder_error(self):
+        for json_string, msg in (("", "lept parse expect value"),
+                                 ("[1", "lept parse miss comma or square bracket"),
+                                 ("\"a\\", "lept parse invalid string escape"),
+                                 ("{\"a\":1]", "lept parse miss comma or curly bracket"),
+                                 ("tru", "lept parse invalid value"),
+                                 ("1 2", "lept parse root not singular")):
+            decoder = IncrementalDecoder()
+            with self.assertRaises(LeptJsonParseError) as context:
+                for element in json_string:
+                    decoder.feed(element)
+                decoder.close()
+            self.assertEqual(context.exception.msg, msg)
+        decoder = IncrementalDecoder(multiple=True)
+        decoder.feed('[1]\n[2,\n')
+        with self.assertRaises(LeptJsonParseError) as context:
+            decoder.feed(' 3 x]')
+        self.assertEqual((3, 4, 11), (context.exception.lineno, context.exception.colno,
+                                      context.exception.pos))
+
+    def test_iter_events(self):
+        self.assertEqual([('start_map', None, ()),
+                          ('map_key', 'a', ()),
+                          ('start_array', None, ('a',)),
+                          ('number', 1.0, ('a', 0)),
+                          ('start_map', None, ('a', 1)),
+                          ('map_key', 'b', ('a', 1)),
+                          ('null', None, ('a', 1, 'b')),
+                          ('end_map', None, ('a', 1)),
+                          ('start_array', None, ('a', 2)),
+                          ('end_array', None, ('a', 2)),
+                          ('end_array', None, ('a',)),
+                          ('map_key', 'c', ()),
+                          ('boolean', True, ('c',)),
+                          ('end_map', None, ())],
+                         list(iter_events(' { "a" : [ 1, {"b": null}, [] ], "c": true } ')))
+        self.assertEqual([('string', 'abc', ())], list(iter_events('"abc"')))
+
+    def test_iter_events_error(self):
+        for json_string in ("", "[1", "[1,", "[1 2", "{", "{\"a\"}", "{\"a\":1", "{\"a\":1,",
+                            "{\"a\":1]", "[1}", "1 2", "[\"\\v\"]"):
+            with self.assertRaises(LeptJsonParseError) as context:
+                parse(json_string)
+            with self.assertRaises(LeptJsonParseError) as events_context:
+                list(iter_events(json_string))
+            self.assertEqual(context.exception.msg, events_context.exception.msg)
+
+    def test_parse_select(self):
+        json_string = '{"a": [{"id": 1, "s": "x"}, {"id": 2, "t": [true]}], "b": {"id": 3}, "c": "\\""}'
+        self.assertEqual({"a[*].id": [1.0, 2.0], "*.id": [3.0], "a[1].t[0]": [True], "c": ['"'],
+                          "a[2]": [], "$": [parse(json_string)]},
+                         parse(json_string, select=["a[*].id", "*.id", "a[1].t[0]", "c", "a[2]", "$"]))
+        with open(os.path.join(DATA_DIR, 'twitter.json'), encoding='utf-8') as file:
+            json_string = file.read()
+        statuses = parse(json_string)['statuses']
+        self.assertEqual({"statuses[*].user.id": [status['user']['id'] for status in statuses]},
+                         parse(json_string, select=["statuses[*].user.id"]))
+        self.assertRaises(ValueError, parse, '[]', select=["a..b"])
+
+    def test_parse_select_error(self):
+        for json_string, msg in (("", "lept parse expect value"),
+                                 ("{\"a\":[1,2", "lept parse miss comma or square bracket"),
+                                 ("{\"a\":\"b", "lept parse miss quotation mark"),
+                                 ("{\"a\":[\"]}", "lept parse miss quotation mark"),
+                                 ("{\"a\" 1}", "lept parse miss colon"),
+                                 ("{\"a\":tru}", "lept parse invalid value"),
+                                 ("[] 1", "lept parse root not singular")):
+            with self.assertRaises(LeptJsonParseError) as context:
+                parse(json_string, select=["b"])
+            self.assertEqual(context.exception.msg, msg)
+
+    def test_parse_lazy(self):
+        with open(os.path.join(DATA_DIR, 'twitter.json'), encoding='utf-8') as file:
+            json_string = file.read()
+        expected = parse(json_string)
+        result = parse_lazy(json_string)
+        self.assertEqual(expected['statuses'][3]['user']['id'], result['statuses'][3]['user']['id'])
+        self.assertEqual(expected, result)
+        self.assertEqual(expected, result.materialize())
+        self.assertEqual(1.0, parse_lazy(" 1 "))
+        self.assertEqual([], parse_lazy("[ ]").materialize())
+        json_string = '[{"a":' * 3000 + '1' + '}]' * 3000
+        result = parse_lazy(json_string)
+        self.assertEqual(json_string, stringify(result.materialize()))
+        self.assertTrue(result == parse(json_string))
+        self.assertFalse(parse(json_string.replace('1', '2')) == result)
+        self.assertEqual([1.0], parse_lazy("[1]", max_depth=1))
+        with self.assertRaises(LeptJsonParseError) as context:
+            parse_lazy(json_string, max_depth=5999)
+        self.assertEqual("lept parse max depth exceeded", context.exception.msg)
+
+    def test_parse_lazy_error(self):
+        result = parse_lazy('{"a": [1, {"b" 2}], "c": "d"}')
+        self.assertEqual("d", result["c"])
+        self.assertEqual(2, len(result["a"]))
+        with self.assertRaises(LeptJsonParseError) as context:
+            result["a"][1]["b"]
+        self.assertEqual(context.exception.msg, "lept parse miss colon")
+        for json_string, msg in (("", "lept parse expect value"),
+                                 ("[1", "lept parse miss comma or square bracket"),
+                                 ("[\"]", "lept parse miss quotation mark"),
+                                 ("[] 1", "lept parse root not singular")):
+            with self.assertRaises(LeptJsonParseError) as context:
+                parse_lazy(json_string)
+            self.assertEqual(context.exception.msg, msg)
+
+    def test_parse_bytes(self):
+        self.assertEqual("Hello\u20ac\u20acWorld", parse(b'"Hello\\u20AC\xe2\x82\xacWorld"'))
+        path = os.path.join(DATA_DIR, 'twitter.json')
+        with open(path, 'rb') as file:
+            json_bytes = file.read()
+        expected = parse(json_bytes.decode('utf-8'))
+        self.assertEqual(expected, parse(json_bytes))
+        self.assertEqual(expected, parse(bytearray(json_bytes)))
+        self.assertEqual(expected, parse(memoryview(json_bytes)))
+        self.assertEqual(expected, load(path))
+        self.exception(b'"\xff"', "lept parse invalid utf-8")
+        self.exception(b'["\xe2\x82"]', "lept parse invalid utf-8")
+        self.exception(b'\xc3\xa9', "lept parse invalid value")
+
+    def exception(self, json_string, msg, **kwargs):
         with self.assertRaises(LeptJsonParseError) as context:
-            parse(json_string)
+            parse(json_string, **kwargs)
         self.assertEqual(context.exception.msg, msg)
+        if isinstance(json_string, str):
+            self.exception(json_string.encode('utf-8'), msg, **kwargs)
 
     def roundtrip(self, json_string):
         self.assertEqual(stringify(parse(json_string)), json_string)